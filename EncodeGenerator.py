@@ -1,7 +1,6 @@
 import os
 import cv2
 import face_recognition
-import pickle
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QLabel, QPushButton,
     QVBoxLayout, QMessageBox, QHBoxLayout
@@ -9,6 +8,11 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtGui import QPixmap, QImage
 from PyQt5.QtCore import Qt, QTimer
 
+from gallery import Gallery
+from gallery_index import build_index, index_path_for
+from shared_gallery import publish_gallery, read_generation
+from settings import ENCODINGS_PATH, IVF_MIN_GALLERY, IVF_LISTS, IVF_PROBE, SHARED_GALLERY_DIR
+
 # ================================================================
 # Project: Face Recognition Based Attendance System
 # Author: Arnav Pundir
@@ -20,6 +24,7 @@ from PyQt5.QtCore import Qt, QTimer
 
 # os.environ["QT_QPA_PLATFORM"] = "wayland"
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png')
 
 class FaceCropperApp(QMainWindow):
     def __init__(self, home_window=None):
@@ -77,39 +82,79 @@ class FaceCropperApp(QMainWindow):
         else:
             QMessageBox.critical(self, "Folder Not Found", f"Default folder '{self.folder_path}' does not exist.")
 
+    def iter_student_photos(self):
+        # Two layouts are supported and can be mixed:
+        #   images/<uid>.jpg          one photo, named after the University ID
+        #   images/<uid>/<any>.jpg    several photos of the same student
+        # Hidden entries (caches such as an old images/.thumbs) are never students
+        for entry in sorted(os.listdir(self.folder_path)):
+            if entry.startswith("."):
+                continue
+            path = os.path.join(self.folder_path, entry)
+            if os.path.isdir(path):
+                for filename in sorted(os.listdir(path)):
+                    if filename.lower().endswith(IMAGE_EXTS):
+                        yield entry, os.path.join(path, filename), os.path.join(entry, filename)
+            elif entry.lower().endswith(IMAGE_EXTS):
+                yield os.path.splitext(entry)[0], path, entry
+
     def process_images(self):
         encodings = []
         names = []
 
-        for filename in os.listdir(self.folder_path):
-            if filename.endswith(('.jpg', '.jpeg', '.png')):
-                img_path = os.path.join(self.folder_path, filename)
-                name = os.path.splitext(filename)[0]
-
-                image = cv2.imread(img_path)
-                rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                boxes = face_recognition.face_locations(rgb_image)
-                face_encs = face_recognition.face_encodings(rgb_image, boxes)
-
-                if face_encs:
-                    encodings.append(face_encs[0])
-                    names.append(name)
-
-                    # Update preview and status
-                    self.display_image(rgb_image)
-                    self.status_label.setText(f"✅ Processed: {filename}")
-                    QApplication.processEvents()
-                else:
-                    self.status_label.setText(f"⚠ No face found in: {filename}")
-                    QApplication.processEvents()
+        for name, img_path, filename in self.iter_student_photos():
+            image = cv2.imread(img_path)
+            if image is None:
+                self.status_label.setText(f"⚠ Could not read: {filename}")
+                QApplication.processEvents()
+                continue
+            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            boxes = face_recognition.face_locations(rgb_image)
+            face_encs = face_recognition.face_encodings(rgb_image, boxes)
+
+            if face_encs:
+                encodings.append(face_encs[0])
+                names.append(name)
+
+                # Update preview and status
+                self.display_image(rgb_image)
+                self.status_label.setText(f"✅ Processed: {filename}")
+                QApplication.processEvents()
+            else:
+                self.status_label.setText(f"⚠ No face found in: {filename}")
+                QApplication.processEvents()
 
         if encodings and names:
-            with open('EncodeFile.p', 'wb') as f:
-                pickle.dump((encodings, names), f)
-            self.status_label.setText("🎉 All faces encoded Successfully`")
+            gallery = Gallery.from_labels(encodings, names)
+            gallery.save(ENCODINGS_PATH)
+            gallery.index = self.build_gallery_index(gallery)
+            self.publish_shared_gallery(gallery)
+            self.status_label.setText(
+                f"🎉 All faces encoded Successfully ({len(gallery)} photos, {gallery.student_count} students)")
         else:
             self.status_label.setText("⚠ No valid face encodings found.")
 
+    def build_gallery_index(self, gallery):
+        # Large galleries get an IVF index saved next to the encodings; small ones
+        # are searched exactly (and any stale index file is removed)
+        kind = "ivf" if len(gallery) >= IVF_MIN_GALLERY else "flat"
+        if kind == "ivf":
+            self.status_label.setText(f"🧮 Building search index for {len(gallery)} faces...")
+            QApplication.processEvents()
+        index = build_index(gallery, kind, n_lists=IVF_LISTS, n_probe=IVF_PROBE or 8)
+        index.save(index_path_for(ENCODINGS_PATH))
+        return index
+
+    def publish_shared_gallery(self, gallery):
+        # Running kiosks pick up a new generation on their own; if none has
+        # published yet the next kiosk start will do it
+        if read_generation(SHARED_GALLERY_DIR) is None:
+            return
+        try:
+            publish_gallery(gallery, SHARED_GALLERY_DIR)
+        except OSError as e:
+            print(f"[WARN] Could not update shared gallery: {e}")
+
     def display_image(self, image):
         rgb_image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
         height, width, channel = rgb_image.shape
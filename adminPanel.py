@@ -1,6 +1,5 @@
 import sys
 import os
-import csv
 import datetime
 import hashlib
 import subprocess
@@ -19,15 +18,14 @@ from fpdf import FPDF
 import shutil
 from PyQt5.QtWidgets import QFileDialog, QMessageBox
 # os.environ["QT_QPA_PLATFORM"] = "wayland"
+from storage import open_storage, labels
+from profiler import ProfilerHotkey
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-STUDENTS_CSV = os.path.join(BASE_DIR, "students.csv")
-ATTENDANCE_CSV = os.path.join(BASE_DIR, "attendance_log.csv")
-ADMINS_CSV = os.path.join(BASE_DIR, "admins.csv")
-
 class RegisterAdminDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, storage, parent=None):
         super().__init__(parent)
+        self.storage = storage
         self.setWindowTitle("Register Admin")
         self.setFixedSize(400, 300)
 
@@ -97,15 +95,7 @@ class RegisterAdminDialog(QDialog):
             QMessageBox.warning(self, "Invalid Email", "Please enter a valid Gmail ID.")
             return
 
-        headers = ["Name", "Gmail", "Password"]
-        file_exists = os.path.exists(ADMINS_CSV)
-
-        # Write to CSV
-        with open(ADMINS_CSV, 'a', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=headers)
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow({"Name": name, "Gmail": gmail, "Password": password})
+        self.storage.append_row("admins", [name, gmail, password])
 
         self.accept()
 
@@ -115,12 +105,22 @@ class AdminPanel(QWidget):
         self.setWindowTitle("Admin Panel - Face Recognition Attendance System")
         self.showFullScreen()
         self.setStyleSheet("background-color: #f6f9fc;")
+        # Students, attendance, admins and login history (CSV files or SQLite,
+        # see ATTENDANCE_STORAGE in settings.py)
+        self.storage = open_storage()
 
         self.stacked_layout = QStackedLayout()
         self.setLayout(self.stacked_layout)
         self.login_name = ''
         self.init_login_ui()
         self.init_admin_ui()  # Load both but show only login first
+        # Hidden profiling switch (Ctrl+Alt+Shift+P, or ATTENDANCE_PROFILE=1)
+        self.profiler = ProfilerHotkey(self, "admin")
+
+    def closeEvent(self, event):
+        self.profiler.finish()
+        self.storage.close()
+        event.accept()
 
     def init_login_ui(self):
         login_widget = QWidget()
@@ -267,24 +267,24 @@ class AdminPanel(QWidget):
 
 
     def open_register_dialog(self):
-        dialog = RegisterAdminDialog(self)
+        dialog = RegisterAdminDialog(self.storage, self)
         dialog.exec_()
 
     def handle_login(self):
         name = self.login_name.text().strip()
         password = self.login_password.text().strip()
 
-        if not os.path.exists(ADMINS_CSV):
+        headers, rows = self.storage.read_table("admins")
+        if not headers:
             QMessageBox.warning(self, "Error", "Admin file not found!")
             return
 
-        with open(ADMINS_CSV, newline='') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if row["Name"] == name and row["Password"] == password:
-                    self.log_login_logout(name, "Login")
-                    self.stacked_layout.setCurrentIndex(1)  # Switch to admin panel
-                    return
+        for row in rows:
+            row = dict(zip(headers, row))
+            if row.get("Name") == name and row.get("Password") == password:
+                self.log_login_logout(name, "Login")
+                self.stacked_layout.setCurrentIndex(1)  # Switch to admin panel
+                return
 
 
         QMessageBox.warning(self, "Login Failed", "Invalid credentials!")
@@ -318,9 +318,10 @@ class AdminPanel(QWidget):
         # Student Group
         student_group = QGroupBox("📚 Student Options")
         student_layout = QVBoxLayout()
-        student_layout.addWidget(self.create_button("📋 View Students", lambda: self.load_table(STUDENTS_CSV)))
+        student_layout.addWidget(self.create_button("📋 View Students", lambda: self.load_table("students")))
         student_layout.addWidget(self.create_button("🧑‍💻 Upload New Student", self.open_upload))
-        student_layout.addWidget(self.create_button("📈 View Attendance Logs", lambda: self.load_table(ATTENDANCE_CSV)))
+        student_layout.addWidget(self.create_button("📈 View Attendance Logs", lambda: self.load_table("attendance")))
+        student_layout.addWidget(self.create_button("📅 Today's Attendance", self.load_today_attendance))
         student_layout.addWidget(self.create_button("✏️ Edit / Remove / Search Students", self.edit_students))
         student_layout.addWidget(self.create_button("📤 Export Attendance Reports", self.export_attendance_reports))
         student_layout.addWidget(self.create_button("📝 Manually Edit Attendance", self.manual_edit_attendance))
@@ -332,7 +333,7 @@ class AdminPanel(QWidget):
         admin_group = QGroupBox("🔐 Admin & Security Controls")
         admin_layout = QVBoxLayout()
         admin_layout.addWidget(self.create_button("🆕 Add New Admin", self.show_add_admin))
-        admin_layout.addWidget(self.create_button("👀 View Admins", lambda: self.load_table(ADMINS_CSV)))
+        admin_layout.addWidget(self.create_button("👀 View Admins", lambda: self.load_table("admins")))
         admin_layout.addWidget(self.create_button("🗑️ Remove Admin", self.show_remove_admin))
         admin_layout.addWidget(self.create_button("🔑 Change Admin Password", self.change_admin_password))
         admin_layout.addWidget(self.create_button("🕓 Login History", self.view_login_logout_history))
@@ -409,7 +410,12 @@ class AdminPanel(QWidget):
         btn.clicked.connect(action)
         return btn
 
-    def load_table(self, csv_path):
+    def load_today_attendance(self):
+        # Only today's partition is read when the log is partitioned
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        self.load_table("attendance", labels("attendance"), self.storage.read_attendance(today, today))
+
+    def load_table(self, table, headers=None, rows=None):
         table_widget = QTableWidget()
         table_widget.setAlternatingRowColors(True)
         table_widget.setStyleSheet("""
@@ -429,20 +435,17 @@ class AdminPanel(QWidget):
         table_widget.setSelectionBehavior(QTableWidget.SelectRows)
         table_widget.setEditTriggers(QTableWidget.NoEditTriggers)
 
-        if not os.path.exists(csv_path):
-            QMessageBox.warning(self, "File Not Found", f"No file found at:\n{csv_path}")
+        if rows is None:
+            headers, rows = self.storage.read_table(table)
+        if not headers:
+            QMessageBox.warning(self, "File Not Found", f"No {table} data found.")
             return
 
-        with open(csv_path, newline='') as file:
-            reader = csv.reader(file)
-            rows = list(reader)
-
         if rows:
-            headers = rows[0]
-            table_widget.setRowCount(len(rows) - 1)
+            table_widget.setRowCount(len(rows))
             table_widget.setColumnCount(len(headers))
             table_widget.setHorizontalHeaderLabels(headers)
-            for i, row in enumerate(rows[1:]):
+            for i, row in enumerate(rows):
                 for j, value in enumerate(row):
                     table_widget.setItem(i, j, QTableWidgetItem(value))
         else:
@@ -525,7 +528,8 @@ class AdminPanel(QWidget):
         self.set_content_widget(form_widget)
 
     def show_remove_admin(self):
-        if not os.path.exists(ADMINS_CSV):
+        headers, rows = self.storage.read_table("admins")
+        if not headers:
             QMessageBox.warning(self, "Error", "Admins file not found.")
             return
 
@@ -548,57 +552,50 @@ class AdminPanel(QWidget):
         table.setSelectionBehavior(QTableWidget.SelectRows)
         table.setEditTriggers(QTableWidget.NoEditTriggers)
 
-        with open(ADMINS_CSV, newline='') as file:
-            reader = list(csv.reader(file))
-            if len(reader) <= 1:
-                table.setRowCount(0)
-            else:
-                valid_rows = [row for row in reader[1:] if len(row) >= 3]
-                table.setRowCount(len(valid_rows))
-                for i, row in enumerate(valid_rows):
-                    for j in range(3):
-                        table.setItem(i, j, QTableWidgetItem(row[j]))
-                    delete_btn = QPushButton("Delete")
-                    delete_btn.setStyleSheet("""
-                        QPushButton {
-                            background-color: #ff4d4d;
-                            color: white;
-                            border-radius: 5px;
-                        }
-                        QPushButton:hover {
-                            background-color: #e60000;
-                        }
-                    """)
-                    delete_btn.clicked.connect(lambda _, index=i: self.delete_admin(index))
-
-                    table.setCellWidget(i, 3, delete_btn)
+        if not rows:
+            table.setRowCount(0)
+        else:
+            # Keep each row's position in the table for delete_admin
+            valid_rows = [(position, row) for position, row in enumerate(rows) if len(row) >= 3]
+            table.setRowCount(len(valid_rows))
+            for i, (position, row) in enumerate(valid_rows):
+                for j in range(3):
+                    table.setItem(i, j, QTableWidgetItem(row[j]))
+                delete_btn = QPushButton("Delete")
+                delete_btn.setStyleSheet("""
+                    QPushButton {
+                        background-color: #ff4d4d;
+                        color: white;
+                        border-radius: 5px;
+                    }
+                    QPushButton:hover {
+                        background-color: #e60000;
+                    }
+                """)
+                delete_btn.clicked.connect(lambda _, index=position: self.delete_admin(index))
+
+                table.setCellWidget(i, 3, delete_btn)
 
         self.set_content_widget(table)
 
     def delete_admin(self, index):
-        # Example logic: remove admin from CSV and refresh the table
+        # Remove the admin and refresh the table
         try:
-            import pandas as pd
-
-            csv_path = os.path.join(BASE_DIR, "admins.csv")  # Or the actual path you use
-            df = pd.read_csv(csv_path)
+            _, rows = self.storage.read_table("admins")
 
-            if index < 0 or index >= len(df):
+            if index < 0 or index >= len(rows):
                 print("Invalid index")
                 return
 
-            # Optional: confirmation dialog
-            from PyQt5.QtWidgets import QMessageBox
             confirm = QMessageBox.question(self, "Confirm Delete",
-                                           f"Are you sure you want to delete admin '{df.iloc[index]['Name']}'?",
+                                           f"Are you sure you want to delete admin '{rows[index][0]}'?",
                                            QMessageBox.Yes | QMessageBox.No)
 
             if confirm == QMessageBox.Yes:
-                df.drop(index=index, inplace=True)
-                df.to_csv(csv_path, index=False)
+                self.storage.delete_row("admins", index)
 
                 QMessageBox.information(self, "Deleted", "Admin removed successfully.")
-                self.load_admins()  # Refresh the table after deletion
+                self.show_remove_admin()  # Refresh the table after deletion
 
         except Exception as e:
             print(f"Error deleting admin: {e}")
@@ -608,14 +605,7 @@ class AdminPanel(QWidget):
             QMessageBox.warning(self, "Error", "All fields are required.")
             return
 
-        if not os.path.exists(ADMINS_CSV):
-            with open(ADMINS_CSV, 'w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(["Name", "Email", "Password"])
-
-        with open(ADMINS_CSV, 'a', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow([name, email, password])
+        self.storage.append_row("admins", [name, email, password])
 
         QMessageBox.information(self, "Success", f"Admin '{name}' added successfully.")
 
@@ -714,25 +704,19 @@ class AdminPanel(QWidget):
                 QMessageBox.warning(change_widget, "Mismatch", "New password and confirmation do not match.")
                 return
 
-            rows = []
             found = False
-            updated = False
-
-            if os.path.exists(ADMINS_CSV):
-                with open(ADMINS_CSV, newline='') as file:
-                    reader = csv.DictReader(file)
-                    for row in reader:
-                        if row["Name"] == admin_name and row["Password"] == old_pass:
-                            row["Password"] = new_pass
-                            found = True
-                            updated = True
-                        rows.append(row)
-
-                if found and updated:
-                    with open(ADMINS_CSV, 'w', newline='') as file:
-                        writer = csv.DictWriter(file, fieldnames=["Name", "Email", "Password"])
-                        writer.writeheader()
-                        writer.writerows(rows)
+            headers, rows = self.storage.read_table("admins")
+
+            if headers:
+                name_col, password_col = headers.index("Name"), headers.index("Password")
+                for position, row in enumerate(rows):
+                    if len(row) <= max(name_col, password_col):
+                        continue
+                    if row[name_col] == admin_name and row[password_col] == old_pass:
+                        self.storage.update_row("admins", position, {password_col: new_pass})
+                        found = True
+
+                if found:
                     QMessageBox.information(change_widget, "Success", "Password updated successfully.")
                     old_password_input.clear()
                     new_password_input.clear()
@@ -740,7 +724,7 @@ class AdminPanel(QWidget):
                 elif not found:
                     QMessageBox.critical(change_widget, "Authentication Failed", "Old password is incorrect.")
             else:
-                QMessageBox.critical(change_widget, "Error", f"Admin database not found: {ADMINS_CSV}")
+                QMessageBox.critical(change_widget, "Error", "Admin database not found.")
 
         change_btn.clicked.connect(handle_change)
 
@@ -798,23 +782,16 @@ class AdminPanel(QWidget):
 
         # Load student data
         def load_data():
-            if not os.path.exists(STUDENTS_CSV):
+            headers, rows = self.storage.read_table("students")
+            if not headers:
                 QMessageBox.warning(self, "Error", "Students file not found!")
                 return
 
-            with open(STUDENTS_CSV, newline='') as file:
-                reader = csv.reader(file)
-                rows = list(reader)
-
-            if not rows:
-                return
-
-            headers = rows[0]
-            table.setRowCount(len(rows) - 1)
+            table.setRowCount(len(rows))
             table.setColumnCount(len(headers))
             table.setHorizontalHeaderLabels(headers)
 
-            for i, row in enumerate(rows[1:]):
+            for i, row in enumerate(rows):
                 for j, value in enumerate(row):
                     item = QTableWidgetItem(value)
                     table.setItem(i, j, item)
@@ -852,7 +829,7 @@ class AdminPanel(QWidget):
 
         def save_changes():
             headers = [table.horizontalHeaderItem(i).text() for i in range(table.columnCount())]
-            rows = [headers]
+            rows = []
             for i in range(table.rowCount()):
                 row_data = []
                 for j in range(table.columnCount()):
@@ -860,9 +837,7 @@ class AdminPanel(QWidget):
                     row_data.append(item.text() if item else "")
                 rows.append(row_data)
 
-            with open(STUDENTS_CSV, "w", newline='') as file:
-                writer = csv.writer(file)
-                writer.writerows(rows)
+            self.storage.write_table("students", headers, rows)
             QMessageBox.information(self, "Success", "Changes saved successfully.")
 
         save_btn.clicked.connect(save_changes)
@@ -898,8 +873,8 @@ class AdminPanel(QWidget):
         self.content_area.setCurrentWidget(edit_widget)
 
     def export_attendance_reports(self):
-        attendance_file = os.path.join(BASE_DIR, "attendance_log.csv") # Path to your attendance log
-        if not os.path.exists(attendance_file):
+        headers, rows = self.storage.read_table("attendance")
+        if not headers:
             QMessageBox.warning(self, "No Data", "Attendance log file not found!")
             return
 
@@ -915,7 +890,7 @@ class AdminPanel(QWidget):
             return  # Cancelled
 
         try:
-            df = pd.read_csv(attendance_file)
+            df = pd.DataFrame(rows, columns=headers)
 
             if save_path.endswith(".xlsx"):
                 df.to_excel(save_path, index=False)
@@ -1009,7 +984,6 @@ class AdminPanel(QWidget):
         self.attendance_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         layout.addWidget(self.attendance_table)
 
-        self.attendance_file = os.path.join(BASE_DIR, "attendance_log.csv")
         self.load_attendance_table()
 
         # Editable fields
@@ -1051,19 +1025,14 @@ class AdminPanel(QWidget):
         self.stacked_layout.setCurrentWidget(edit_widget)
 
     def load_attendance_table(self):
-        if os.path.exists(self.attendance_file):
-            with open(self.attendance_file, newline='') as file:
-                reader = csv.reader(file)
-                rows = list(reader)
-                if len(rows) > 0:
-                    headers = rows[0]
-                    data = rows[1:]
-                    self.attendance_table.setRowCount(len(data))
-                    self.attendance_table.setColumnCount(len(headers))
-                    self.attendance_table.setHorizontalHeaderLabels(headers)
-                    for row_idx, row in enumerate(data):
-                        for col_idx, value in enumerate(row):
-                            self.attendance_table.setItem(row_idx, col_idx, QTableWidgetItem(value))
+        headers, data = self.storage.read_table("attendance")
+        if headers:
+            self.attendance_table.setRowCount(len(data))
+            self.attendance_table.setColumnCount(len(headers))
+            self.attendance_table.setHorizontalHeaderLabels(headers)
+            for row_idx, row in enumerate(data):
+                for col_idx, value in enumerate(row):
+                    self.attendance_table.setItem(row_idx, col_idx, QTableWidgetItem(value))
 
     def choose_and_copy_folder(self):
             # Get the selected folder
@@ -1122,26 +1091,19 @@ class AdminPanel(QWidget):
             QMessageBox.warning(self, "Invalid Input", "All fields must be filled.")
             return
 
-        with open(self.attendance_file, newline='') as file:
-            reader = list(csv.reader(file))
-
-        # Edit the specific row (index + 1 to skip header)
-        reader[self.selected_row_index + 1][0] = new_date
-        reader[self.selected_row_index + 1][1] = new_time
-        reader[self.selected_row_index + 1][3] = new_name  # Assuming name is 4th column
-
-        with open(self.attendance_file, "w", newline='') as file:
-            writer = csv.writer(file)
-            writer.writerows(reader)
+        # Edit the specific row in place; same columns load_selected_attendance_row reads
+        self.storage.update_row("attendance", self.selected_row_index, {
+            5: new_date,
+            6: new_time,
+            0: new_name,
+        })
 
         QMessageBox.information(self, "Success", "Attendance record updated successfully.")
         self.load_attendance_table()
 
     def log_login_logout(self, admin_name, status):  # status = "Login" or "Logout"
-        with open(os.path.join(BASE_DIR, "login_logout_history.csv"), "a", newline='') as file:
-            writer = csv.writer(file)
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            writer.writerow([timestamp, admin_name, status])
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.storage.append_row("login_history", [timestamp, admin_name, status])
 
     def view_login_logout_history(self):
         main_widget = QWidget()
@@ -1193,16 +1155,12 @@ class AdminPanel(QWidget):
         history_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         history_table.setSelectionBehavior(QAbstractItemView.SelectRows)
 
-        # Load from CSV
-        file_path = os.path.join(BASE_DIR, "login_logout_history.csv")
-        if os.path.exists(file_path):
-            with open(file_path, newline='') as file:
-                reader = csv.reader(file)
-                rows = list(reader)
-                history_table.setRowCount(len(rows))
-                for row_idx, row in enumerate(rows):
-                    for col_idx, value in enumerate(row):
-                        history_table.setItem(row_idx, col_idx, QTableWidgetItem(value))
+        _, rows = self.storage.read_table("login_history")
+        if rows:
+            history_table.setRowCount(len(rows))
+            for row_idx, row in enumerate(rows):
+                for col_idx, value in enumerate(row):
+                    history_table.setItem(row_idx, col_idx, QTableWidgetItem(value))
         else:
             history_table.setRowCount(1)
             history_table.setItem(0, 0, QTableWidgetItem("No history available"))
@@ -1220,9 +1178,8 @@ class AdminPanel(QWidget):
 
         if confirm == QMessageBox.Yes:
             try:
-                open(STUDENTS_CSV, 'w').close()
-                open(ATTENDANCE_CSV, 'w').close()
-                open(ADMINS_CSV, 'w').close()
+                for table in ("students", "attendance", "admins"):
+                    self.storage.clear_table(table)
                 QMessageBox.information(self, "Success", "All data cleared.")
             except Exception as e:
                 QMessageBox.warning(self, "Error", str(e))
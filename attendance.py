@@ -0,0 +1,134 @@
+import json
+import os
+from datetime import datetime
+
+from csv_tail import CsvTailReader
+
+INDEX_VERSION = 5
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def index_path_for(log_path):
+    return os.path.splitext(log_path)[0] + ".index.json"
+
+
+def sortable_time(date_str, time_str):
+    # "YYYY-MM-DD HH:MM:SS", which sorts chronologically as a string; None if unparsable
+    text = f"{date_str} {time_str}"
+    if len(text) == 19 and text[4] == text[7] == "-" and text[13] == text[16] == ":":
+        return text
+    try:
+        # Hand-edited rows, e.g. "9:05:00"
+        return datetime.strptime(text.strip(), TIME_FORMAT).strftime(TIME_FORMAT)
+    except ValueError:
+        return None
+
+
+class AttendanceIndex:
+    """Per-student attendance count and last mark, kept in step with the log.
+
+    Built from attendance_log.csv once, then refresh() folds in only the
+    rows appended since (our own marks and anyone else's). The aggregates
+    are saved next to the log together with the read position (on save()
+    and every ``autosave_every`` new rows), so after a restart only the rows
+    written since the last save are scanned. An edited or truncated log is
+    detected and rebuilt from scratch.
+
+    "Last" is the latest date and time, not the last row read: late marks,
+    edited dates and older partitions read after newer ones can't move it
+    backwards.
+    """
+
+    def __init__(self, log_path, path=None, autosave_every=100, reader_factory=None):
+        self.log_path = log_path
+        # Anything with CsvTailReader's read/state/restore, e.g. a partitioned log's tail reader
+        self.reader_factory = reader_factory or (lambda: CsvTailReader(log_path))
+        self.autosave_every = autosave_every
+        self.path = path or index_path_for(log_path)
+        self.counts = {}
+        self.last = {}
+        self._reader = self.reader_factory()
+        self._dirty = False
+        self._unsaved_rows = 0
+        self.load()
+        self.refresh()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_VERSION:
+                return
+            self._reader.restore(data["reader"])
+            self.counts = {uid: int(count) for uid, count in data["counts"].items()}
+            self.last = dict(data["last"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[WARN] Ignoring attendance index {self.path}: {e}")
+            self._reader = self.reader_factory()
+            self.counts, self.last = {}, {}
+
+    def save(self):
+        if not self._dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({
+                    "version": INDEX_VERSION,
+                    "reader": self._reader.state(),
+                    "counts": self.counts,
+                    "last": self.last,
+                }, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+            self._unsaved_rows = 0
+        except OSError as e:
+            print(f"[WARN] Failed to save attendance index: {e}")
+
+    def refresh(self):
+        try:
+            rows, rewritten = self._reader.read(raw=True)
+        except (OSError, UnicodeDecodeError, ValueError) as e:
+            print(f"[WARN] Failed to read {self.log_path}: {e}")
+            return
+        if rewritten:
+            self.counts, self.last = {}, {}
+            self._dirty = True
+        if rows:
+            fields = self._reader.fieldnames
+            try:
+                uid_col, date_col, time_col = (fields.index(name) for name in ("University ID", "Date", "Time"))
+            except ValueError:
+                print(f"[WARN] {self.log_path} is missing University ID/Date/Time columns")
+                return
+            counts, last = self.counts, self.last
+            for row in rows:
+                student_id = row[uid_col]
+                counts[student_id] = counts.get(student_id, 0) + 1
+                stamp = sortable_time(row[date_col], row[time_col])
+                if stamp is not None and stamp > last.get(student_id, ""):
+                    last[student_id] = stamp
+            self._dirty = True
+        # Checkpoint now and then so a crash doesn't mean a long rescan
+        self._unsaved_rows += len(rows)
+        if self.autosave_every and self._unsaved_rows >= self.autosave_every:
+            self.save()
+
+    def summary(self, student_id):
+        # (count, "YYYY-MM-DD HH:MM:SS" or "N/A"), as get_attendance_summary returned
+        self.refresh()
+        return self.counts.get(student_id, 0), self.last.get(student_id, "N/A")
+
+    def last_marked(self, student_id):
+        # datetime of the student's latest mark, or None
+        self.refresh()
+        last = self.last.get(student_id)
+        if last is None:
+            return None
+        try:
+            return datetime.strptime(last, TIME_FORMAT)
+        except ValueError as e:
+            print(f"[WARN] Failed to parse previous attendance time: {e}")
+            return None
@@ -0,0 +1,408 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+from datetime import date, timedelta
+
+from csv_tail import CsvTailReader, replacing
+
+MANIFEST_NAME = "manifest.json"
+UID_COL, DATE_COL = 1, 5
+
+
+def _open_text(path, mode="r"):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", newline="")
+    return open(path, mode, newline="")
+
+
+class PartitionedAttendanceLog:
+    """The attendance log split into one CSV per day or per month.
+
+    Files live in ``directory`` as 2026-03-14.csv (or 2026-03.csv) and every
+    partition keeps the usual header, so each one is a valid attendance log
+    on its own. Partitions older than the compression cut-off are gzipped
+    to .csv.gz and stay readable.
+
+    manifest.json records, per partition, the file, row count, the
+    University ID range and the file's size/mtime. Entries are refreshed
+    from the file whenever its size or mtime no longer match, so appends by
+    other processes, or a manifest update that failed after the rows were
+    written, never leave the manifest wrong for long. Date-range
+    queries only open partitions whose key falls in the range, and
+    per-student queries also skip partitions whose ID range can't hold the
+    student.
+    """
+
+    def __init__(self, directory, header, granularity="day"):
+        self.directory = directory
+        self.header = list(header)
+        self.granularity = granularity
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    def key_for(self, date_str):
+        return date_str[:7] if self.granularity == "month" else date_str[:10]
+
+    def path_for(self, key, compressed=False):
+        return os.path.join(self.directory, f"{key}.csv.gz" if compressed else f"{key}.csv")
+
+    def _load_manifest(self):
+        self._manifest_stat = self._stat_manifest()
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get("granularity") == self.granularity:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        manifest = {"granularity": self.granularity, "partitions": {}}
+        self._scan(manifest)
+        return manifest
+
+    def _save_manifest(self):
+        # A temp file of its own, so kiosks saving at once can't clobber each other's
+        with replacing(self.manifest_path) as tmp_path, open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        self._manifest_stat = self._stat_manifest()
+
+    def _update_manifest(self):
+        # Save after rows are already on disk: a stale manifest is corrected
+        # by the next refresh(), so a failure here must not fail the write
+        try:
+            self._save_manifest()
+        except OSError as e:
+            print(f"[WARN] Failed to update {self.manifest_path}: {e}")
+
+    def _stat_manifest(self):
+        try:
+            st = os.stat(self.manifest_path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _scan(self, manifest):
+        # Rebuild the manifest from whatever partition files exist
+        manifest["partitions"] = {}
+        for name in os.listdir(self.directory):
+            if name.endswith(".csv") or name.endswith(".csv.gz"):
+                key = name.split(".")[0]
+                manifest["partitions"][key] = self._describe(key, name.endswith(".gz"))
+
+    def _describe(self, key, compressed):
+        path = self.path_for(key, compressed)
+        rows = self._read_file(path)
+        ids = [row[UID_COL] for row in rows if len(row) > UID_COL]
+        st = os.stat(path)
+        return {
+            "file": os.path.basename(path),
+            "compressed": compressed,
+            "rows": len(rows),
+            "min_id": min(ids) if ids else None,
+            "max_id": max(ids) if ids else None,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+        }
+
+    def refresh(self, full=True):
+        """Picks up partitions written or changed by other processes.
+
+        The full check lists the directory and stats every partition. With
+        full=False, as the tail reader calls it on every lookup, only the
+        manifest and the newest partition are stat'ed: the manifest is
+        reloaded if another process saved it, and the newest partition is
+        the one kiosks keep appending to.
+        """
+        if not full:
+            return self._refresh_newest()
+        changed = False
+        seen = set()
+        for name in os.listdir(self.directory):
+            if not (name.endswith(".csv") or name.endswith(".csv.gz")):
+                continue
+            key = name.split(".")[0]
+            seen.add(key)
+            entry = self.manifest["partitions"].get(key)
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            if entry is None or entry["file"] != name or (entry["size"], entry["mtime_ns"]) != (st.st_size, st.st_mtime_ns):
+                self.manifest["partitions"][key] = self._describe(key, name.endswith(".gz"))
+                changed = True
+        for key in set(self.manifest["partitions"]) - seen:
+            del self.manifest["partitions"][key]
+            changed = True
+        if changed:
+            self._update_manifest()
+        return changed
+
+    def _refresh_newest(self):
+        changed = self._stat_manifest() != self._manifest_stat
+        if changed:
+            self.manifest = self._load_manifest()
+        keys = self.keys()
+        if not keys:
+            return changed
+        key = keys[-1]
+        entry = self.manifest["partitions"][key]
+        if entry["compressed"] or self._matches(entry, self.path_for(key)):
+            return changed
+        try:
+            self.manifest["partitions"][key] = self._describe(key, False)
+        except OSError:
+            # Gone; the next full refresh drops it
+            return changed
+        self._update_manifest()
+        return True
+
+    def keys(self, start=None, end=None):
+        # Partition keys overlapping [start, end] (YYYY-MM-DD strings), oldest first
+        lo = self.key_for(start) if start else None
+        hi = self.key_for(end) if end else None
+        return [key for key in sorted(self.manifest["partitions"])
+                if (lo is None or key >= lo) and (hi is None or key <= hi)]
+
+    def partition_path(self, key):
+        return os.path.join(self.directory, self.manifest["partitions"][key]["file"])
+
+    def _read_file(self, path):
+        with _open_text(path) as f:
+            rows = list(csv.reader(f))
+        return [row for row in rows[1:] if any(row)]
+
+    def read_partition(self, key):
+        return self._read_file(self.partition_path(key))
+
+    def read_range(self, start=None, end=None):
+        self.refresh()
+        rows = []
+        for key in self.keys(start, end):
+            for row in self.read_partition(key):
+                if (start is None or row[DATE_COL] >= start) and (end is None or row[DATE_COL] <= end):
+                    rows.append(row)
+        return rows
+
+    def rows_for_student(self, student_id, start=None, end=None):
+        self.refresh()
+        rows = []
+        for key in self.keys(start, end):
+            entry = self.manifest["partitions"][key]
+            if entry["min_id"] is None or not entry["min_id"] <= student_id <= entry["max_id"]:
+                continue
+            rows.extend(row for row in self.read_partition(key) if row[UID_COL] == student_id)
+        return rows
+
+    def append_rows(self, rows, fsync=False):
+        partitions = self.manifest["partitions"]
+        by_key = {}
+        for row in rows:
+            by_key.setdefault(self.key_for(row[DATE_COL]), []).append(row)
+        for key, key_rows in by_key.items():
+            if key in partitions and partitions[key]["compressed"]:
+                # Late row for an archived period: reopen the partition
+                self._decompress(key)
+            entry = partitions.get(key)
+            path = self.path_for(key)
+            up_to_date = entry is not None and self._matches(entry, path)
+            with open(path, "a", newline="") as f:
+                writer = csv.writer(f)
+                if os.stat(path).st_size == 0:
+                    writer.writerow(self.header)
+                writer.writerows(key_rows)
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            if up_to_date:
+                ids = [entry["min_id"], entry["max_id"]] + [row[UID_COL] for row in key_rows]
+                ids = [i for i in ids if i is not None]
+                st = os.stat(path)
+                partitions[key] = dict(entry, rows=entry["rows"] + len(key_rows), min_id=min(ids),
+                                       max_id=max(ids), size=st.st_size, mtime_ns=st.st_mtime_ns)
+            else:
+                partitions[key] = self._describe(key, False)
+        self._update_manifest()
+
+    def _matches(self, entry, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return (entry["size"], entry["mtime_ns"]) == (st.st_size, st.st_mtime_ns)
+
+    def write_partition(self, key, rows):
+        # Rewrite one partition in place, keeping its compression
+        compressed = self.manifest["partitions"].get(key, {}).get("compressed", False)
+        path = self.path_for(key, compressed)
+        with replacing(path) as tmp_path, \
+                (gzip.open(tmp_path, "wt", newline="") if compressed else open(tmp_path, "w", newline="")) as f:
+            writer = csv.writer(f)
+            writer.writerow(self.header)
+            writer.writerows(rows)
+        if rows:
+            self.manifest["partitions"][key] = self._describe(key, compressed)
+        else:
+            os.remove(path)
+            self.manifest["partitions"].pop(key, None)
+        self._save_manifest()
+
+    def locate(self, position):
+        # (key, index within partition) of the position-th row in read_range() order
+        self.refresh()
+        for key in self.keys():
+            count = self.manifest["partitions"][key]["rows"]
+            if position < count:
+                return key, position
+            position -= count
+        raise IndexError("attendance row out of range")
+
+    def update_row(self, position, changes):
+        key, index = self.locate(position)
+        rows = self.read_partition(key)
+        for col, value in changes.items():
+            rows[index][col] = value
+        moved = self.key_for(rows[index][DATE_COL]) != key
+        if moved:
+            # A changed date moves the row to its new partition
+            row = rows.pop(index)
+        self.write_partition(key, rows)
+        if moved:
+            self.append_rows([row])
+
+    def delete_row(self, position):
+        key, index = self.locate(position)
+        rows = self.read_partition(key)
+        del rows[index]
+        self.write_partition(key, rows)
+
+    def replace_all(self, rows):
+        self.clear()
+        if rows:
+            self.append_rows(rows)
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".csv") or name.endswith(".csv.gz"):
+                os.remove(os.path.join(self.directory, name))
+        self.manifest = {"granularity": self.granularity, "partitions": {}}
+        self._save_manifest()
+
+    def _decompress(self, key):
+        src = self.path_for(key, True)
+        with gzip.open(src, "rb") as f_in, open(self.path_for(key), "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(src)
+        self.manifest["partitions"][key] = self._describe(key, False)
+
+    def compress_older_than(self, days):
+        # gzip partitions that end more than `days` days ago
+        if days <= 0:
+            return 0
+        cutoff = self.key_for((date.today() - timedelta(days=days)).isoformat())
+        count = 0
+        for key in self.keys():
+            entry = self.manifest["partitions"][key]
+            if entry["compressed"] or key >= cutoff:
+                continue
+            src = self.path_for(key)
+            with replacing(self.path_for(key, True)) as tmp_path, \
+                    open(src, "rb") as f_in, gzip.open(tmp_path, "wb") as f_out:
+                shutil.copyfileobj(f_in, f_out)
+            os.remove(src)
+            self.manifest["partitions"][key] = self._describe(key, True)
+            count += 1
+        if count:
+            self._save_manifest()
+        return count
+
+    def import_log(self, path):
+        # One-shot split of a single attendance_log.csv into partitions
+        with open(path, newline="") as f:
+            rows = list(csv.reader(f))
+        if rows:
+            self.append_rows([row for row in rows[1:] if any(row)])
+        return max(0, len(rows) - 1)
+
+    def tail_reader(self):
+        return PartitionTailReader(self)
+
+
+class PartitionTailReader:
+    """CsvTailReader over every partition, for AttendanceIndex.
+
+    Open partitions are tailed with their own CsvTailReader. Compressed
+    ones never change once written, so they are read whole the first time
+    and skipped afterwards; if a partition's rows shrink or disappear the
+    reader reports a rewrite and starts over. Partitions whose manifest
+    entry hasn't changed since the last read aren't touched, so a lookup
+    costs the few stats of refresh(full=False), however many days the
+    log holds.
+    """
+
+    def __init__(self, log):
+        self.log = log
+        self.fieldnames = list(log.header)
+        self.readers = {}
+        self.consumed = {}
+        # (size, mtime_ns) of each partition's manifest entry as last read
+        self.seen = {}
+
+    def read(self, raw=False):
+        rows, rewritten = self._read()
+        if rewritten:
+            self.readers, self.consumed, self.seen = {}, {}, {}
+            rows, _ = self._read()
+        if not raw:
+            rows = [dict(zip(self.fieldnames, row)) for row in rows]
+        return rows, rewritten
+
+    def _read(self):
+        self.log.refresh(full=False)
+        partitions = self.log.manifest["partitions"]
+        if set(self.consumed) - set(partitions):
+            return [], True
+        rows = []
+        for key in self.log.keys():
+            entry = partitions[key]
+            version = [entry["size"], entry["mtime_ns"]]
+            if self.seen.get(key) == version:
+                continue
+            consumed = self.consumed.get(key, 0)
+            if entry["rows"] < consumed:
+                return [], True
+            if entry["compressed"]:
+                self.readers.pop(key, None)
+                new_rows = self.log.read_partition(key)[consumed:] if entry["rows"] > consumed else []
+            elif key in self.readers:
+                new_rows, rewritten = self.readers[key].read(raw=True)
+                if rewritten:
+                    return [], True
+            else:
+                # First look at this file (or it was just decompressed):
+                # skip rows already taken from the compressed copy
+                reader = self.readers[key] = CsvTailReader(self.log.path_for(key))
+                new_rows, _ = reader.read(raw=True)
+                new_rows = new_rows[consumed:]
+            rows.extend(new_rows)
+            self.consumed[key] = consumed + len(new_rows)
+            self.seen[key] = version
+        return rows, False
+
+    def state(self):
+        return {
+            "fieldnames": self.fieldnames,
+            "consumed": self.consumed,
+            "seen": self.seen,
+            "readers": {key: reader.state() for key, reader in self.readers.items()},
+        }
+
+    def restore(self, state):
+        self.consumed = {key: int(n) for key, n in state["consumed"].items()}
+        self.seen = {key: list(version) for key, version in state["seen"].items()}
+        self.readers = {}
+        for key, reader_state in state["readers"].items():
+            reader = CsvTailReader(self.log.path_for(key))
+            reader.restore(reader_state)
+            self.readers[key] = reader
@@ -0,0 +1,183 @@
+import csv
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from storage import open_storage, labels
+from settings import (ATTENDANCE_WRITE_QUEUE, ATTENDANCE_FLUSH_INTERVAL, ATTENDANCE_FSYNC,
+                      ATTENDANCE_RETRY_INTERVAL, ATTENDANCE_SPILL_FILE)
+
+
+class AttendanceWriter(threading.Thread):
+    """Write-behind attendance: the GUI enqueues rows, this thread writes them.
+
+    Rows are collected for up to ``flush_interval`` seconds and written as
+    one batch through a storage handle the thread opens itself, so the GUI
+    never touches the disk when marking. With fsync "batch" every batch is
+    flushed to stable storage before it counts as written; "off" leaves it
+    to the OS.
+
+    Rows stay in ``pending`` until their batch is written, and
+    last_pending()/pending_count() let the kiosk include them in its
+    duplicate check and attendance totals straight away. The queue is
+    bounded; if the disk falls that far behind, submit() blocks rather than
+    dropping a mark.
+
+    A batch that fails to write is kept, together with anything queued
+    after it, and retried every ``retry_interval`` seconds; ``error`` holds
+    the last failure until a write succeeds again. A write can fail after
+    some rows reached the disk (a failed fsync, say), so retries skip rows
+    the storage already has. Rows still unwritten when the writer is
+    closed are appended to ``spill_path`` rather than lost.
+    """
+
+    def __init__(self, window=None, max_queue=ATTENDANCE_WRITE_QUEUE,
+                 flush_interval=ATTENDANCE_FLUSH_INTERVAL, fsync=ATTENDANCE_FSYNC, storage_factory=open_storage,
+                 metrics=None, retry_interval=ATTENDANCE_RETRY_INTERVAL, spill_path=ATTENDANCE_SPILL_FILE):
+        super().__init__(daemon=True, name="attendance-writer")
+        self.window = window
+        self.flush_interval = max(0.0, flush_interval)
+        self.fsync = fsync == "batch"
+        self.storage_factory = storage_factory
+        # Optional metrics.StageMetrics; batch write times go to "attendance_write"
+        self.metrics = metrics
+        self.retry_interval = retry_interval
+        self.spill_path = spill_path
+        self.error = None
+        self._queue = queue.Queue(maxsize=max(1, max_queue))
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._closing = threading.Event()
+
+    def submit(self, values, now=None):
+        # values: one attendance row in storage column order
+        now = now or datetime.now()
+        with self._lock:
+            self._pending.setdefault(values[1], []).append(now)
+        try:
+            self._queue.put_nowait(values)
+        except queue.Full:
+            print("[WARN] Attendance writer is behind, waiting for the disk")
+            self._queue.put(values)
+
+    def last_pending(self, student_id):
+        with self._lock:
+            marks = self._pending.get(student_id)
+            return marks[-1] if marks else None
+
+    def pending_count(self, student_id):
+        with self._lock:
+            return len(self._pending.get(student_id, ()))
+
+    def run(self):
+        storage = self.storage_factory()
+        try:
+            try:
+                storage.maintain()
+            except Exception as e:
+                print(f"[WARN] Attendance storage maintenance failed: {e}")
+            failed = []
+            while not (self._closing.is_set() and self._queue.empty() and not failed):
+                if failed:
+                    # Back off, then retry with whatever was queued meanwhile
+                    self._closing.wait(self.retry_interval)
+                    batch = self._collect(failed, 0.0)
+                else:
+                    try:
+                        batch = [self._queue.get(timeout=0.2)]
+                    except queue.Empty:
+                        continue
+                    batch = self._collect(batch, self.flush_interval)
+                if self._write(storage, batch, retry=bool(failed)):
+                    failed = []
+                elif self._closing.is_set():
+                    self._spill(storage, batch)
+                    failed = []
+                else:
+                    failed = batch
+        finally:
+            storage.close()
+
+    def _collect(self, batch, wait):
+        # Add rows queued within ``wait`` seconds to the batch
+        deadline = time.monotonic() + wait
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _write(self, storage, batch, retry=False, attempts=3):
+        # True once the batch is stored; on failure it stays pending
+        for attempt in range(attempts):
+            try:
+                start = time.perf_counter()
+                rows = self._unwritten(storage, batch) if retry or attempt else batch
+                if rows:
+                    storage.write_attendance(rows, self.window, self.fsync)
+                if self.metrics is not None:
+                    self.metrics.record("attendance_write", (time.perf_counter() - start) * 1000.0)
+                self.error = None
+                self._done(batch)
+                return True
+            except Exception as e:
+                self.error = str(e)
+                print(f"[WARN] Failed to write {len(batch)} attendance rows (attempt {attempt + 1}): {e}")
+                if attempt + 1 < attempts:
+                    time.sleep(0.5)
+        print(f"[ERROR] {len(batch)} attendance rows are not saved yet; retrying every {self.retry_interval:g} s")
+        return False
+
+    def _unwritten(self, storage, batch):
+        # Rows of a previously failed batch that didn't reach the storage
+        return [values for values in batch if not storage.has_mark(values[1], values[5], values[6])]
+
+    def _spill(self, storage, batch):
+        # Last resort at shutdown: keep the rows in a plain CSV for re-import
+        try:
+            rows = self._unwritten(storage, batch)
+        except Exception as e:
+            print(f"[WARN] Could not check which attendance rows were saved: {e}")
+            rows = batch
+        if not rows:
+            self._done(batch)
+            return
+        try:
+            with open(self.spill_path, "a", newline="") as f:
+                writer = csv.writer(f)
+                if os.stat(self.spill_path).st_size == 0:
+                    writer.writerow(labels("attendance"))
+                writer.writerows(rows)
+                f.flush()
+                os.fsync(f.fileno())
+            print(f"[ERROR] Saved {len(rows)} unwritten attendance rows to {self.spill_path}")
+        except OSError as e:
+            print(f"[ERROR] Could not save unwritten attendance rows to {self.spill_path}: {e}")
+            for values in rows:
+                print(f"[ERROR] Unsaved attendance row: {','.join(values)}")
+        self._done(batch)
+
+    def _done(self, batch):
+        with self._lock:
+            for values in batch:
+                marks = self._pending.get(values[1])
+                if marks:
+                    marks.pop(0)
+                    if not marks:
+                        del self._pending[values[1]]
+        for _ in batch:
+            self._queue.task_done()
+
+    def flush(self):
+        # Blocks until everything submitted so far is on disk (or, at
+        # shutdown, in the spill file); waits out any write failures
+        if self.is_alive():
+            self._queue.join()
+
+    def close(self):
+        self._closing.set()
+        if self.is_alive():
+            self.join()
@@ -0,0 +1,97 @@
+"""Recall/latency of Gallery.match with the IVF index against brute force.
+
+    python benchmarks/bench_index.py --size 40000 --queries 500
+    python benchmarks/bench_index.py --size 40000 --templates 4
+    python benchmarks/bench_index.py --gallery EncodeFile.p
+
+Both sides go through Gallery.match, as the kiosk does: brute force
+aggregates every student's templates exactly, IVF proposes
+IVF_CANDIDATES rows whose owners are then re-ranked over all of their
+templates. Recall is per student: how often the best student agrees with
+brute force.
+
+Without --gallery a synthetic gallery is generated: clustered random 128-D
+vectors, which is closer to real face encodings than uniform noise, with
+--templates photos per student.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gallery import Gallery  # noqa: E402
+from gallery_index import BruteForceIndex, IVFIndex  # noqa: E402
+from settings import IVF_CANDIDATES  # noqa: E402
+
+
+def synthetic_gallery(size, clusters=256, spread=0.12, seed=0, templates=1, photo_noise=0.05):
+    # About ``size`` rows; with templates > 1 each student gets that many jittered photos
+    rng = np.random.default_rng(seed)
+    students = max(1, size // templates)
+    centers = rng.normal(0.0, 0.1, size=(clusters, 128))
+    members = rng.integers(0, clusters, size=students)
+    encodings = centers[members] + rng.normal(0.0, spread / np.sqrt(128), size=(students, 128))
+    if templates > 1:
+        encodings = np.repeat(encodings, templates, axis=0)
+        encodings += rng.normal(0.0, photo_noise / np.sqrt(128), size=encodings.shape)
+    return Gallery.from_labels(encodings, [f"S{i // templates:06d}" for i in range(len(encodings))])
+
+
+def make_queries(gallery, count, noise=0.03, seed=1):
+    # Perturbed copies of enrolled faces, like a new photo of a known student
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(gallery), size=count)
+    return gallery.matrix[rows] + rng.normal(0.0, noise / np.sqrt(128), size=(count, 128)).astype(np.float32)
+
+
+def time_match(gallery, queries, batch):
+    # Best student per query through whatever index the gallery has, and ms/query
+    start = time.perf_counter()
+    best = []
+    for i in range(0, len(queries), batch):
+        best.extend(matches[0][0] if matches else None for matches in gallery.match(queries[i:i + batch]))
+    elapsed = time.perf_counter() - start
+    return np.array(best, dtype=object), elapsed * 1000.0 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gallery", help="encodings pickle to benchmark instead of a synthetic gallery")
+    parser.add_argument("--size", type=int, default=40000)
+    parser.add_argument("--templates", type=int, default=1, help="photos per synthetic student")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=1, help="faces matched per call (1 = one face per frame)")
+    parser.add_argument("--lists", type=int, default=0, help="IVF lists (0 = sqrt(N))")
+    parser.add_argument("--probes", default="1,2,4,8,16,32")
+    args = parser.parse_args()
+
+    if args.gallery:
+        gallery = Gallery.load(args.gallery, index="flat")
+    else:
+        gallery = synthetic_gallery(args.size, templates=max(1, args.templates))
+    queries = make_queries(gallery, args.queries)
+
+    start = time.perf_counter()
+    ivf = IVFIndex.build(gallery, n_lists=args.lists)
+    build_s = time.perf_counter() - start
+    print(f"gallery={len(gallery)} students={gallery.student_count} lists={len(ivf.centroids)} "
+          f"candidates={IVF_CANDIDATES} build={build_s:.2f}s")
+
+    gallery.index = BruteForceIndex(gallery)
+    exact_ids, exact_ms = time_match(gallery, queries, args.batch)
+    print(f"{'index':<12}{'ms/query':>10}{'recall@1':>10}{'speedup':>10}")
+    print(f"{'brute':<12}{exact_ms:>10.3f}{1.0:>10.3f}{1.0:>10.1f}")
+    gallery.index = ivf
+    for probe in [int(p) for p in args.probes.split(",")]:
+        ivf.n_probe = max(1, min(probe, len(ivf.centroids)))
+        ids, ms = time_match(gallery, queries, args.batch)
+        recall = float(np.mean(ids == exact_ids))
+        print(f"{'ivf/' + str(ivf.n_probe):<12}{ms:>10.3f}{recall:>10.3f}{exact_ms / ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
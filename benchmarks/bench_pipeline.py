@@ -0,0 +1,336 @@
+"""End-to-end timings for the recognition pipeline, written as JSON.
+
+    python benchmarks/bench_pipeline.py --out bench.json
+    python benchmarks/bench_pipeline.py --clip recordings/gate.mp4 --out bench.json --compare baseline.json
+    python benchmarks/bench_pipeline.py --input bench.json --compare baseline.json
+    python benchmarks/bench_pipeline.py --quick --only match,mark
+
+Groups (--only picks a subset):
+  detect  HOG detection per frame at each --scales factor and --upsamples count
+  encode  one 128-D encoding per face
+  match   one face against synthetic galleries of --gallery-sizes (exact, and
+          IVF where the kiosk would build one)
+  mark    AttendanceEngine.mark_attendance for --mark-batch new students and
+          the background write of that batch (writer.flush()), against
+          logs of --log-sizes rows; first call (index build) and steady state
+  render  VideoWidget painting a frame with overlays, offscreen
+
+Frames come from --clip (a video file or a directory of images) or are
+synthetic noise; HOG cost barely depends on content. Encoding uses faces
+found in the clip, or a centred box on synthetic frames.
+
+--compare flags every timing more than --tolerance slower than the
+baseline and exits with status 1 if there is any, so it can gate CI.
+Groups whose dependencies are missing are recorded as skipped.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_index import synthetic_gallery, make_queries  # noqa: E402
+from settings import ATTENDANCE_FSYNC  # noqa: E402
+
+GROUPS = ("detect", "encode", "match", "mark", "render")
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def measure(fn, repeat, warmup=1):
+    # Median/p95/mean of repeated calls in milliseconds
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    samples = np.array(samples)
+    return {
+        "ms": float(np.median(samples)),
+        "p95": float(np.percentile(samples, 95)),
+        "mean": float(samples.mean()),
+        "n": int(len(samples)),
+    }
+
+
+def load_frames(clip, count, width=640, height=480):
+    if not clip:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8) for _ in range(count)]
+    import cv2
+    frames = []
+    if os.path.isdir(clip):
+        for name in sorted(os.listdir(clip)):
+            if name.lower().endswith(IMAGE_EXTS) and len(frames) < count:
+                frame = cv2.imread(os.path.join(clip, name))
+                if frame is not None:
+                    frames.append(frame)
+    else:
+        cap = cv2.VideoCapture(clip)
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    if not frames:
+        raise SystemExit(f"no frames could be read from {clip}")
+    return frames
+
+
+def to_rgb(frames):
+    # BGR -> RGB without needing OpenCV
+    return [np.ascontiguousarray(frame[:, :, ::-1]) for frame in frames]
+
+
+def bench_detect(frames, args):
+    import cv2
+    import face_recognition
+
+    results = {}
+    rgb = to_rgb(frames)
+    for scale in args.scales:
+        for upsample in args.upsamples:
+            state = {"i": 0}
+
+            def detect():
+                # The same resize + HOG call FaceDetector.scan makes
+                img = rgb[state["i"] % len(rgb)]
+                state["i"] += 1
+                if scale != 1.0:
+                    img = cv2.resize(img, (0, 0), fx=scale, fy=scale)
+                face_recognition.face_locations(img, number_of_times_to_upsample=upsample)
+
+            results[f"detect/scale={scale:g}/upsample={upsample}"] = measure(detect, args.repeat)
+    return results
+
+
+def face_boxes(rgb):
+    # (top, right, bottom, left) of faces in the clip, else a centred box
+    import face_recognition
+    for img in rgb[:10]:
+        found = face_recognition.face_locations(img)
+        if found:
+            return img, found[0]
+    height, width = rgb[0].shape[:2]
+    side = min(height, width) // 2
+    top, left = (height - side) // 2, (width - side) // 2
+    return rgb[0], (top, left + side, top + side, left)
+
+
+def bench_encode(frames, args):
+    import face_recognition
+
+    img, location = face_boxes(to_rgb(frames))
+    return {"encode/per_face": measure(lambda: face_recognition.face_encodings(img, [location]), args.repeat)}
+
+
+def bench_match(frames, args):
+    from gallery_index import IVFIndex
+    from settings import IVF_MIN_GALLERY
+
+    results = {}
+    for size in args.gallery_sizes:
+        gallery = synthetic_gallery(size)
+        queries = make_queries(gallery, max(args.repeat, 1) + 1)
+        state = {"i": 0}
+
+        def match():
+            gallery.match(queries[state["i"] % len(queries)][None, :])
+            state["i"] += 1
+
+        label = f"{size // 1000}k" if size % 1000 == 0 else str(size)
+        results[f"match/{label}/exact"] = measure(match, args.repeat)
+        if size >= IVF_MIN_GALLERY:
+            gallery.index = IVFIndex.build(gallery)
+            results[f"match/{label}/ivf"] = measure(match, args.repeat)
+    return results
+
+
+def write_log(path, rows, students=5000):
+    # Synthetic attendance log dated well before today, so no mark is a duplicate
+    start = datetime(2020, 1, 1, 9)
+    with open(path, "w", newline="") as f:
+        f.write("Name,University ID,Program,Branch,Mobile,Date,Time\n")
+        for i in range(rows):
+            when = start + timedelta(seconds=37 * i)
+            f.write(f"Student {i % students},U{i % students:06d},BTech,CSE,9999999999,"
+                    f"{when:%Y-%m-%d},{when:%H:%M:%S}\n")
+
+
+def bench_mark(frames, args):
+    from engine import AttendanceEngine
+    from storage import CsvStorage, SqliteStorage, TABLES
+
+    results = {}
+    for rows in args.log_sizes:
+        directory = tempfile.mkdtemp(prefix="bench-attendance-")
+        try:
+            paths = {table: os.path.join(directory, spec["csv"]) for table, spec in TABLES.items()}
+            write_log(paths["attendance"], rows)
+            label = f"{rows // 1000000}M" if rows % 1000000 == 0 else f"{rows // 1000}k"
+
+            start = time.perf_counter()
+            if args.storage == "sqlite":
+                storage = SqliteStorage(os.path.join(directory, "attendance.db"), paths)
+            else:
+                storage = CsvStorage(paths, partition="none")
+            engine = AttendanceEngine(storage)
+            engine.last_marked("U000000")
+            results[f"mark/{label}/first"] = {"ms": (time.perf_counter() - start) * 1000.0, "n": 1}
+            # Write each batch as soon as it is queued rather than after the kiosk's batching delay
+            engine.writer.flush_interval = 0.0
+
+            state = {"i": 0}
+
+            def mark():
+                # Duplicate check, queueing and the batch reaching the temp log
+                for _ in range(args.mark_batch):
+                    i = state["i"]
+                    state["i"] += 1
+                    engine.mark_attendance({"Name": f"New {i}", "University ID": f"N{i:06d}", "Program": "BTech",
+                                            "Branch": "CSE", "Mobile": "9999999999"})
+                engine.writer.flush()
+
+            results[f"mark/{label}/batch={args.mark_batch}"] = measure(mark, args.repeat)
+            engine.close()
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def bench_render(frames, args):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtGui import QImage
+    from video_widget import VideoWidget
+
+    app = QApplication.instance() or QApplication([])
+    widget = VideoWidget(960, 720)
+    target = QImage(widget.size(), QImage.Format_RGB32)
+    overlays = [((200, 120, 360, 300), (0, 255, 0),
+                 [("ID: U000001", (255, 255, 0)), ("Blinks: 1/3", (0, 255, 255))])]
+    state = {"i": 0}
+
+    def render():
+        widget.set_frame(frames[state["i"] % len(frames)], overlays)
+        state["i"] += 1
+        widget.render(target)
+
+    result = measure(render, args.repeat)
+    app.processEvents()
+    h, w = frames[0].shape[:2]
+    return {f"render/{w}x{h}": result}
+
+
+def compare(current, baseline, tolerance):
+    # Print a table of ratios; returns the names that regressed
+    regressions = []
+    print(f"{'benchmark':<36}{'baseline ms':>13}{'current ms':>13}{'ratio':>8}")
+    for name, now in sorted(current["results"].items()):
+        then = baseline["results"].get(name)
+        if not then or "ms" not in now or "ms" not in then or then["ms"] <= 0:
+            continue
+        ratio = now["ms"] / then["ms"]
+        flag = ""
+        if ratio > 1.0 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1.0 - tolerance:
+            flag = "  faster"
+        print(f"{name:<36}{then['ms']:>13.3f}{now['ms']:>13.3f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def parse_list(kind):
+    return lambda text: [kind(value) for value in text.split(",") if value]
+
+
+def run(args):
+    frames = load_frames(args.clip, args.frames)
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "clip": args.clip or "synthetic",
+            "repeat": args.repeat,
+            "storage": args.storage,
+            "fsync": ATTENDANCE_FSYNC,
+        },
+        "results": {},
+        "skipped": {},
+    }
+    benches = {"detect": bench_detect, "encode": bench_encode, "match": bench_match,
+               "mark": bench_mark, "render": bench_render}
+    for group in args.only:
+        print(f"[INFO] {group} ...", file=sys.stderr)
+        try:
+            report["results"].update(benches[group](frames, args))
+        except ImportError as e:
+            print(f"[WARN] Skipping {group}: {e}", file=sys.stderr)
+            report["skipped"][group] = str(e)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clip", help="video file or directory of images (default: synthetic frames)")
+    parser.add_argument("--frames", type=int, default=30, help="frames to load from the clip")
+    parser.add_argument("--only", type=parse_list(str), default=list(GROUPS), help="comma-separated groups")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--scales", type=parse_list(float), default=[1.0, 0.5, 0.25])
+    parser.add_argument("--upsamples", type=parse_list(int), default=[0, 1, 2])
+    parser.add_argument("--gallery-sizes", type=parse_list(int), default=[1000, 10000, 100000])
+    parser.add_argument("--log-sizes", type=parse_list(int), default=[10000, 1000000])
+    parser.add_argument("--storage", choices=("csv", "sqlite"), default="csv")
+    parser.add_argument("--mark-batch", type=int, default=1, help="marks written per timed mark call")
+    parser.add_argument("--quick", action="store_true", help="small galleries/logs and fewer repeats")
+    parser.add_argument("--out", help="write results as JSON here")
+    parser.add_argument("--input", help="compare this results file instead of running")
+    parser.add_argument("--compare", help="baseline results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown before flagging (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    unknown = set(args.only) - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(sorted(unknown))}")
+    if args.quick:
+        args.repeat = min(args.repeat, 5)
+        args.gallery_sizes = [size for size in args.gallery_sizes if size <= 10000]
+        args.log_sizes = [size for size in args.log_sizes if size <= 10000]
+
+    if args.input:
+        with open(args.input) as f:
+            report = json.load(f)
+    else:
+        report = run(args)
+        for name, result in sorted(report["results"].items()):
+            print(f"{name:<36}{result['ms']:>10.3f} ms")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"[WARN] {len(regressions)} regressions beyond {args.tolerance:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import queue
+
+from capture import FrameGrabber
+from recognition import RecognitionPipeline
+
+
+def run_camera(camera, source, gallery, results, stop_event, width=640, height=480):
+    """Capture + recognition loop for one camera, run in its own process.
+
+    Each processed frame is sent back together with its result so the UI can
+    draw it. When the UI falls behind the packet is dropped rather than
+    queued, the same latest-frame-wins policy FrameGrabber uses.
+    """
+    grabber = FrameGrabber(source, width, height)
+    grabber.start()
+    pipeline = RecognitionPipeline(gallery)
+    seq = 0
+    try:
+        while not stop_event.is_set():
+            # On timeout latest() hands back the frame already processed
+            new_seq, frame = grabber.latest(after_seq=seq, timeout=0.5)
+            if frame is None or new_seq == seq:
+                continue
+            seq = new_seq
+            result = pipeline.process(seq, frame)
+            if result is None:
+                continue
+            result["camera"] = camera
+            result["timings"]["capture"] = grabber.capture_ms
+            result["frame"] = frame
+            try:
+                results.put_nowait(result)
+            except queue.Full:
+                pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.close()
+        grabber.stop()
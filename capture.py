@@ -0,0 +1,65 @@
+import threading
+import time
+
+import cv2
+
+
+class FrameGrabber(threading.Thread):
+    """Reads the camera on its own thread and keeps only the newest frame.
+
+    The slot holds a single frame: every successful read overwrites it, so
+    consumers never see a backlog, they just get whatever arrived last
+    together with its sequence number.
+    """
+
+    def __init__(self, source=0, width=640, height=480):
+        super().__init__(daemon=True)
+        self.source = source
+        self.cap = cv2.VideoCapture(source)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        # Ask the driver not to queue frames behind our back (V4L2 honours this)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._running = True
+        # Decode time of the newest frame, excluding the wait for the camera
+        self.capture_ms = 0.0
+
+    def run(self):
+        while self._running:
+            # grab() waits for the sensor; retrieve() is the decode we pay for
+            if not self.cap.grab():
+                time.sleep(0.01)
+                continue
+            start = time.perf_counter()
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                continue
+            self.capture_ms = (time.perf_counter() - start) * 1000.0
+            with self._cond:
+                self._frame = frame
+                self._seq += 1
+                self._cond.notify_all()
+
+    def latest(self, after_seq=None, timeout=None):
+        # Returns (seq, frame). With after_seq the call waits up to timeout
+        # seconds for a frame newer than after_seq.
+        with self._cond:
+            if after_seq is not None and timeout:
+                self._cond.wait_for(lambda: self._seq > after_seq or not self._running, timeout)
+            return self._seq, self._frame
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def stop(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout=1.0)
+        if self.cap.isOpened():
+            self.cap.release()
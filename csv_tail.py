@@ -0,0 +1,150 @@
+import csv
+import io
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+# Bytes just before the parsed offset, re-read to tell an append from a rewrite
+TAIL_CHECK = 64
+
+
+@contextmanager
+def replacing(path):
+    """Yields a temporary path next to ``path`` that replaces it on success.
+
+    Readers see either the old file or the new one, never a half-written
+    mix, and the new file has a new inode, which is how CsvTailReader
+    tells a rewrite from an append. Every rewrite of a tailed file must go
+    through here; appends stay in place.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    os.close(fd)
+    try:
+        yield tmp_path
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        else:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class CsvTailReader:
+    """Reads a CSV file incrementally, returning only rows not seen before.
+
+    read() returns (rows, rewritten). Rewrites replace the file (see
+    replacing()), so a new inode, a file that did not grow, or a header or
+    last-read bytes that no longer match mean the reader starts over and
+    returns every row with rewritten=True, so callers can drop their state.
+    Otherwise just the appended tail is parsed, whatever the file's size.
+    A half-written last line is left for the next call. With raw=True rows
+    are plain value lists in ``fieldnames`` order, which is much cheaper for
+    large logs.
+
+    state()/restore() let callers persist the position alongside whatever
+    they derived from the rows, so a restart only reads what was appended.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._reset()
+        self.stat = None
+
+    def _reset(self):
+        self.fieldnames = []
+        self.offset = 0
+        self.head = b""
+        self.tail = b""
+        # Inode and size as of the last read
+        self.inode = None
+        self.size = 0
+
+    def changed(self):
+        return self._stat() != self.stat
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def read(self, raw=False):
+        stat = self._stat()
+        if stat is None:
+            rewritten = self.offset > 0
+            self._reset()
+            self.stat = None
+            return [], rewritten
+        if stat == self.stat:
+            return [], False
+
+        inode, _, size = stat
+        rewritten = self.offset > 0 and (
+            (self.inode is not None and inode != self.inode)
+            or size <= self.size or size < self.offset or not self._is_append()
+        )
+        if rewritten:
+            self._reset()
+        rows = self._read_from(self.offset, raw)
+        self.stat = stat
+        self.inode, self.size = inode, size
+        return rows, rewritten
+
+    def _is_append(self):
+        # Two small reads: the header and the last bytes parsed
+        with open(self.path, "rb") as f:
+            if f.read(len(self.head)) != self.head:
+                return False
+            f.seek(self.offset - len(self.tail))
+            return f.read(len(self.tail)) == self.tail
+
+    def _read_from(self, offset, raw=False):
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return []
+        if offset == 0:
+            self.head = data[:data.find(b"\n") + 1]
+        text = data[:end].decode("utf-8-sig" if offset == 0 else "utf-8")
+        rows = []
+        for values in csv.reader(io.StringIO(text, newline="")):
+            if not self.fieldnames:
+                self.fieldnames = [field.strip() for field in values]
+                continue
+            if not any(values):
+                continue
+            values += [""] * (len(self.fieldnames) - len(values))
+            rows.append(values if raw else dict(zip(self.fieldnames, values)))
+        self.offset = offset + end
+        self.tail = (self.tail + data[:end])[-TAIL_CHECK:]
+        return rows
+
+    def state(self):
+        return {
+            "fieldnames": self.fieldnames,
+            "offset": self.offset,
+            "head": self.head.hex(),
+            "tail": self.tail.hex(),
+            "inode": self.inode,
+            "size": self.size,
+        }
+
+    def restore(self, state):
+        # Position only; the next read() re-checks the file before trusting it
+        self.fieldnames = list(state["fieldnames"])
+        self.offset = int(state["offset"])
+        self.head = bytes.fromhex(state["head"])
+        self.tail = bytes.fromhex(state["tail"])
+        self.inode = state["inode"]
+        self.size = int(state["size"])
+        self.stat = None
@@ -0,0 +1,87 @@
+import cv2
+import face_recognition
+
+from settings import ROI_DETECTION, ROI_FULL_SCAN_EVERY, ROI_SCAN_SCALE, ROI_MARGIN, ROI_FACE_SIZE
+from tracking import box_iou
+from metrics import null_clock
+
+
+def to_location(box):
+    # (x1, y1, x2, y2) frame box -> face_recognition's (top, right, bottom, left)
+    x1, y1, x2, y2 = box
+    return (int(y1), int(x2), int(y2), int(x1))
+
+
+def suppress_duplicates(boxes, max_iou=0.4):
+    # Overlapping ROI crops can find the same face twice; keep the larger box
+    kept = []
+    for box in sorted(boxes, key=lambda b: (b[2] - b[0]) * (b[3] - b[1]), reverse=True):
+        if all(box_iou(box, other) <= max_iou for other in kept):
+            kept.append(box)
+    return kept
+
+
+class FaceDetector:
+    """HOG face detection with an optional region-of-interest mode.
+
+    Without hints (or every ROI_FULL_SCAN_EVERY calls) the whole frame is
+    scanned at ROI_SCAN_SCALE, which is cheap but misses small, distant
+    faces. Otherwise only crops around the hinted boxes -- where faces were
+    last seen -- are scanned, each resized so the face is about
+    ROI_FACE_SIZE pixels wide. That keeps distant faces at a detectable
+    size while the cost follows face area instead of frame area.
+
+    Boxes are always (x1, y1, x2, y2) in full-frame pixels.
+    """
+
+    def __init__(self, roi=ROI_DETECTION, full_scan_every=ROI_FULL_SCAN_EVERY, scan_scale=ROI_SCAN_SCALE,
+                 margin=ROI_MARGIN, face_size=ROI_FACE_SIZE):
+        self.roi = roi
+        self.full_scan_every = max(1, full_scan_every)
+        self.scan_scale = scan_scale
+        self.margin = margin
+        self.face_size = face_size
+        self._calls = 0
+
+    def detect(self, img_rgb, hints=(), clock=null_clock):
+        # clock times the resize and detect stages (see metrics.StageClock)
+        self._calls += 1
+        if not self.roi or not hints or self._calls % self.full_scan_every == 0:
+            return self.scan(img_rgb, None, self.scan_scale, clock)
+
+        boxes = []
+        for hint in hints:
+            region = self.expand(hint, img_rgb.shape)
+            width = max(1, hint[2] - hint[0])
+            # Never upscale beyond the native frame; dlib upsamples once itself
+            scale = min(1.0, self.face_size / width)
+            boxes.extend(self.scan(img_rgb, region, scale, clock))
+        return suppress_duplicates(boxes)
+
+    def expand(self, box, shape):
+        height, width = shape[:2]
+        x1, y1, x2, y2 = box
+        pad_x = int((x2 - x1) * self.margin)
+        pad_y = int((y2 - y1) * self.margin)
+        return (max(0, x1 - pad_x), max(0, y1 - pad_y), min(width, x2 + pad_x), min(height, y2 + pad_y))
+
+    def scan(self, img_rgb, region, scale, clock=null_clock):
+        height, width = img_rgb.shape[:2]
+        x0, y0, x1, y1 = region or (0, 0, width, height)
+        crop = img_rgb[y0:y1, x0:x1]
+        if crop.size == 0:
+            return []
+        if scale != 1.0:
+            with clock("resize"):
+                crop = cv2.resize(crop, (0, 0), fx=scale, fy=scale)
+        boxes = []
+        with clock("detect"):
+            locations = face_recognition.face_locations(crop)
+        for top, right, bottom, left in locations:
+            box = (
+                max(0, int(left / scale) + x0), max(0, int(top / scale) + y0),
+                min(width - 1, int(right / scale) + x0), min(height - 1, int(bottom / scale) + y0),
+            )
+            if box[2] > box[0] and box[3] > box[1]:
+                boxes.append(box)
+        return boxes
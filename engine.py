@@ -0,0 +1,148 @@
+from datetime import datetime, timedelta
+
+from storage import open_storage
+from liveness import LivenessStore
+from attendance_writer import AttendanceWriter
+
+EAR_THRESHOLD = 0.22
+REQUIRED_BLINKS = 3
+ATTENDANCE_WINDOW = timedelta(minutes=10)
+
+
+class AttendanceEngine:
+    """Blink verification and attendance marking for recognition results.
+
+    The GUI-free half of the kiosk: feed it what RecognitionPipeline
+    returns and it keeps per-face blink state, decides when a student is
+    verified and marks them through the attendance writer. The kiosk and
+    the headless runner both drive it, so they mark attendance the same way.
+
+    handle_result() returns one update per face:
+
+        {"face": face, "status": "unknown" | "blink" | "welcome" | "no_ear",
+         "blinks": 2, "event": None or {"type": "marked" | "duplicate" | "missing", ...}}
+
+    An event is only attached on the frame a student completes verification.
+    With ``write=False`` nothing is written and marks are only remembered
+    for the session, for dry runs over recorded footage.
+    """
+
+    def __init__(self, storage=None, window=ATTENDANCE_WINDOW, ear_threshold=EAR_THRESHOLD,
+                 required_blinks=REQUIRED_BLINKS, write=True, metrics=None):
+        self.storage = storage or open_storage()
+        self.window = window
+        self.ear_threshold = ear_threshold
+        self.required_blinks = required_blinks
+        # Blink progress per face and who was marked recently; bounded, and
+        # a student is verified again once the attendance window has passed
+        self.liveness = LivenessStore(window)
+        self.writer = None
+        self.session_marks = {}
+        if write:
+            # Marks are written in the background, through the writer's own
+            # handle on this same storage; callers never wait on disk
+            self.writer = AttendanceWriter(window, storage_factory=self.storage.reopen, metrics=metrics)
+            self.writer.start()
+
+    def track_key(self, camera, face):
+        # Track IDs are per camera; without tracking fall back to the student
+        track_id = face.get("track_id")
+        return (camera, track_id if track_id is not None else face["student_id"])
+
+    def blink_state(self, camera, face):
+        # Current blink progress for a face still being verified, or None
+        state = self.liveness.peek(self.track_key(camera, face))
+        if state is None or state["student_id"] != face["student_id"]:
+            return None
+        return state
+
+    def handle_result(self, result, camera=0, now=None):
+        # Blink progress is kept per track; "already marked" is kept per
+        # student, so a student seen by two cameras is still only marked once
+        now = now or datetime.now()
+        self.liveness.expire(now)
+        updates = []
+        for face in result["faces"]:
+            student_id = face["student_id"]
+            update = {"face": face, "status": "unknown", "blinks": 0, "event": None}
+            updates.append(update)
+            if student_id is None:
+                continue
+            if face["ear"] is None:
+                update["status"] = "no_ear"
+                continue
+            if self.liveness.is_logged(student_id, now):
+                update["status"] = "welcome"
+                update["blinks"] = self.required_blinks
+                continue
+
+            state = self.liveness.track(self.track_key(camera, face), student_id, now)
+            if face["ear"] < self.ear_threshold:
+                state["eye_closed"] = True
+            elif state["eye_closed"]:
+                state["blinks"] += 1
+                state["eye_closed"] = False
+            update["status"] = "blink"
+            update["blinks"] = state["blinks"]
+
+            if state["blinks"] >= self.required_blinks:
+                self.liveness.mark_logged(student_id, now)
+                update["status"] = "welcome"
+                update["event"] = self.mark_attendance(self.get_student_info(student_id), now)
+        return updates
+
+    def get_student_info(self, student_id):
+        # O(1); the directory re-reads students.csv itself when it changes
+        return self.storage.get_student(student_id)
+
+    def get_attendance_summary(self, student_id):
+        # Written marks plus any still queued in the attendance writer
+        count, last_time = self.storage.attendance_summary(student_id)
+        pending = self.writer.last_pending(student_id) if self.writer else None
+        if pending is not None:
+            count += self.writer.pending_count(student_id)
+            last_time = pending.strftime("%Y-%m-%d %H:%M:%S")
+        return count, last_time
+
+    def last_marked(self, student_id):
+        if self.writer is None:
+            last = self.session_marks.get(student_id)
+            return last if last is not None else self.storage.last_marked(student_id)
+        pending = self.writer.last_pending(student_id)
+        return pending if pending is not None else self.storage.last_marked(student_id)
+
+    def mark_attendance(self, student_info, now=None):
+        if not student_info:
+            return {"type": "missing", "student_id": None, "time": None}
+
+        now = now or datetime.now()
+        student_id = student_info.get("University ID", "N/A")
+
+        last_time = self.last_marked(student_id)
+        if last_time is not None and now - last_time < self.window:
+            return {"type": "duplicate", "student_id": student_id, "time": last_time}
+
+        row = [
+            student_info.get("Name", "N/A"),
+            student_info.get("University ID", "N/A"),
+            student_info.get("Program", "N/A"),
+            student_info.get("Branch", "N/A"),
+            student_info.get("Mobile", "N/A"),
+            now.strftime("%Y-%m-%d"),
+            now.strftime("%H:%M:%S")
+        ]
+        if self.writer is not None:
+            # Queued for the writer thread; counts as marked from here on
+            self.writer.submit(row, now)
+        else:
+            self.session_marks[student_id] = now
+        return {"type": "marked", "student_id": student_id, "time": now, "row": row}
+
+    def write_error(self):
+        # Why queued marks aren't saved yet (they are being retried), else None
+        return self.writer.error if self.writer is not None else None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.storage.close()
@@ -0,0 +1,190 @@
+import pickle
+
+import numpy as np
+
+from gallery_index import BruteForceIndex, load_index, index_path_for
+from settings import (
+    ENCODINGS_PATH, GALLERY_INDEX, IVF_PROBE, IVF_CANDIDATES, GALLERY_AGGREGATE, GALLERY_AGGREGATE_TOP
+)
+
+ENCODING_SIZE = 128
+GALLERY_FORMAT_VERSION = 2
+
+
+class Gallery:
+    """Known face encodings as one contiguous float32 (N, 128) matrix.
+
+    A student can have several encodings (templates). Student IDs are stored
+    once in ``ids``; ``owners`` maps every matrix row to its index in ``ids``
+    and rows are kept grouped by owner. ``slots`` is an (S, T) table of each
+    student's rows, padded with N, so per-student aggregation is one gather.
+
+    Squared row norms are computed once at load time, so matching a whole
+    frame's worth of faces is a single matmul:
+    ||q - g||^2 = ||q||^2 + ||g||^2 - 2 q.g
+
+    search() is always exact and works on rows; match() works on students
+    and goes through ``index``, which is brute force unless an approximate
+    index was loaded alongside the file.
+    """
+
+    def __init__(self, encodings, owners, ids, sq_norms=None):
+        matrix = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        owners = np.asarray(owners, dtype=np.int64).reshape(-1)
+        self.ids = list(ids)
+        if len(owners) != len(matrix):
+            raise ValueError(f"Gallery has {len(matrix)} encodings but {len(owners)} owners")
+        if len(owners) and (owners.min() < 0 or owners.max() >= len(self.ids)):
+            raise ValueError("Gallery owner index out of range")
+
+        # Keep each student's templates next to each other. Already grouped
+        # input (saved or shared galleries) is used as is, without a copy
+        if np.all(owners[1:] >= owners[:-1]):
+            self.matrix = np.ascontiguousarray(matrix)
+            self.owners = owners
+        else:
+            order = np.argsort(owners, kind="stable")
+            self.matrix = np.ascontiguousarray(matrix[order])
+            self.owners = owners[order]
+            sq_norms = None
+        if sq_norms is None:
+            sq_norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+        self.sq_norms = sq_norms
+
+        counts = np.bincount(self.owners, minlength=len(self.ids))
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+        width = int(counts.max()) if len(counts) else 0
+        offsets = np.arange(width)[None, :]
+        self.template_counts = counts
+        self.slots = np.where(offsets < counts[:, None], starts[:, None] + offsets, len(self.matrix))
+
+        self.index = BruteForceIndex(self)
+
+    @classmethod
+    def from_labels(cls, encodings, labels):
+        # One label per encoding, repeated for students with several photos
+        ids = list(dict.fromkeys(labels))
+        position = {student_id: i for i, student_id in enumerate(ids)}
+        return cls(encodings, [position[label] for label in labels], ids)
+
+    @classmethod
+    def load(cls, path=ENCODINGS_PATH, index=GALLERY_INDEX):
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if isinstance(data, dict):
+            gallery = cls(data["encodings"], data["owners"], data["ids"])
+        else:
+            # Original format: (list of encodings, list of IDs), one row per ID
+            encodings, student_ids = data
+            gallery = cls.from_labels(encodings, student_ids)
+        gallery.index = load_index(gallery, index_path_for(path), index, IVF_PROBE or None)
+        return gallery
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump({
+                "version": GALLERY_FORMAT_VERSION,
+                "encodings": self.matrix,
+                "owners": self.owners.astype(np.int32),
+                "ids": self.ids,
+            }, f)
+
+    def __len__(self):
+        return len(self.matrix)
+
+    @property
+    def student_count(self):
+        return len(self.ids)
+
+    def distances(self, queries):
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        q_sq = np.einsum("ij,ij->i", queries, queries)
+        d2 = queries @ self.matrix.T
+        d2 *= -2.0
+        d2 += q_sq[:, None]
+        d2 += self.sq_norms[None, :]
+        # Rounding can push a perfect match a hair below zero
+        np.maximum(d2, 0.0, out=d2)
+        return np.sqrt(d2, out=d2)
+
+    def search(self, queries, k=1):
+        # Returns (rows, distances), both (Q, k) and sorted nearest first
+        dist = self.distances(queries)
+        k = min(k, dist.shape[1])
+        if k == 0:
+            empty = np.empty((dist.shape[0], 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+        if k < dist.shape[1]:
+            rows = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        else:
+            rows = np.broadcast_to(np.arange(k), dist.shape).copy()
+        top = np.take_along_axis(dist, rows, axis=1)
+        order = np.argsort(top, axis=1)
+        return np.take_along_axis(rows, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+    def student_distances(self, queries, aggregate=GALLERY_AGGREGATE, top=GALLERY_AGGREGATE_TOP):
+        # Exact (Q, S) distance from every query to every student
+        dist = self.distances(queries)
+        padded = np.concatenate([dist, np.full((len(dist), 1), np.inf, dtype=dist.dtype)], axis=1)
+        return aggregate_templates(padded[:, self.slots], aggregate, top)
+
+    def _candidate_distances(self, query, students, aggregate, top):
+        # Exact aggregated distance from one query to a subset of students
+        slots = self.slots[students]
+        valid = slots < len(self.matrix)
+        rows = slots[valid]
+        d2 = self.sq_norms[rows] - 2.0 * (self.matrix[rows] @ query) + float(query @ query)
+        per_template = np.full(slots.shape, np.inf, dtype=np.float32)
+        per_template[valid] = np.sqrt(np.maximum(d2, 0.0))
+        return aggregate_templates(per_template, aggregate, top)
+
+    def match(self, queries, k=1, aggregate=GALLERY_AGGREGATE, top=GALLERY_AGGREGATE_TOP):
+        """Match every query in one pass.
+
+        Returns one list per query of up to k (student_id, distance) pairs,
+        nearest student first; thresholding is left to the caller. A
+        student's distance is the min (or mean of the ``top`` closest) over
+        all of their templates.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        if len(queries) == 0 or len(self) == 0:
+            return [[] for _ in range(len(queries))]
+
+        if isinstance(self.index, BruteForceIndex):
+            per_student = self.student_distances(queries, aggregate, top)
+            students = np.broadcast_to(np.arange(self.student_count), per_student.shape)
+        else:
+            # Approximate index proposes candidate rows; their owners are then
+            # re-ranked exactly over all of their templates
+            rows, _ = self.index.search(queries, max(k, IVF_CANDIDATES))
+            per_student, students = [], []
+            for query, query_rows in zip(queries, rows):
+                owners = np.unique(self.owners[query_rows[query_rows >= 0]])
+                per_student.append(self._candidate_distances(query, owners, aggregate, top))
+                students.append(owners)
+
+        results = []
+        for query_students, query_dist in zip(students, per_student):
+            kk = min(k, len(query_dist))
+            if kk == 0:
+                results.append([])
+                continue
+            best = np.argpartition(query_dist, kk - 1)[:kk] if kk < len(query_dist) else np.arange(kk)
+            best = best[np.argsort(query_dist[best])]
+            results.append([(self.ids[query_students[i]], float(query_dist[i])) for i in best])
+        return results
+
+
+def aggregate_templates(per_template, aggregate="min", top=1):
+    # per_template: (..., T) distances with inf for padding -> (...)
+    width = per_template.shape[-1]
+    if width == 0:
+        return np.full(per_template.shape[:-1], np.inf, dtype=np.float32)
+    if aggregate == "min" or top <= 1 or width == 1:
+        return per_template.min(axis=-1)
+    t = min(top, width)
+    best = np.partition(per_template, t - 1, axis=-1)[..., :t]
+    finite = np.isfinite(best)
+    count = finite.sum(axis=-1)
+    total = np.where(finite, best, 0.0).sum(axis=-1)
+    return np.where(count > 0, total / np.maximum(count, 1), np.inf).astype(np.float32)
@@ -0,0 +1,174 @@
+import os
+
+import numpy as np
+
+# Indexes answer the same question as Gallery.search -- the k nearest gallery
+# rows for each query -- and return (rows, distances), both (Q, k), nearest
+# first. They are built by EncodeGenerator.py and saved next to the
+# encodings so every kiosk loads the same index instead of rebuilding it.
+
+
+def index_path_for(encodings_path):
+    return os.path.splitext(encodings_path)[0] + ".index.npz"
+
+
+def gallery_fingerprint(matrix):
+    # Cheap identity check so a stale index file is never used with a newer
+    # gallery; the position-weighted sum also catches reordered rows
+    row_sums = matrix.sum(axis=1, dtype=np.float64)
+    return np.array([len(matrix), float(row_sums.sum()), float(row_sums @ np.arange(1, len(matrix) + 1))])
+
+
+def _sq_norms(x):
+    return np.einsum("ij,ij->i", x, x)
+
+
+def _nearest(data, centroids, chunk=8192):
+    c_sq = _sq_norms(centroids)
+    assign = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), chunk):
+        block = data[start:start + chunk]
+        d2 = c_sq[None, :] - 2.0 * (block @ centroids.T)
+        assign[start:start + chunk] = np.argmin(d2, axis=1)
+    return assign
+
+
+def kmeans(data, n_clusters, iterations=20, sample_size=50000, seed=0):
+    rng = np.random.default_rng(seed)
+    data = np.asarray(data, dtype=np.float32)
+    train = data if len(data) <= sample_size else data[rng.choice(len(data), sample_size, replace=False)]
+    n_clusters = min(n_clusters, len(train))
+    centroids = train[rng.choice(len(train), n_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = _nearest(train, centroids)
+        counts = np.bincount(assign, minlength=n_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, train)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        # Re-seed empty clusters on random training points
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = train[rng.choice(len(train), len(empty), replace=False)]
+    return centroids
+
+
+class BruteForceIndex:
+    kind = "flat"
+
+    def __init__(self, gallery):
+        self.gallery = gallery
+
+    def search(self, queries, k=1):
+        return self.gallery.search(queries, k)
+
+    def save(self, path):
+        # Nothing to persist; drop any stale IVF file so loaders fall back to exact search
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class IVFIndex:
+    """Inverted-file index over a k-means coarse quantizer.
+
+    Gallery rows are bucketed by nearest centroid and stored contiguously
+    per bucket. A query only scans the n_probe buckets whose centroids are
+    closest, so latency scales with n_probe / n_lists of the gallery while
+    recall rises towards exact search as n_probe grows.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, gallery, centroids, order, offsets, n_probe=8, vectors=None, vector_sq=None):
+        self.gallery = gallery
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.centroid_sq = _sq_norms(self.centroids)
+        self.order = np.asarray(order, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.n_probe = max(1, min(n_probe, len(self.centroids)))
+        # Bucket-ordered copy of the gallery so each probed list is one slice;
+        # shared galleries pass in the copy that was published with them
+        if vectors is None:
+            vectors = np.ascontiguousarray(gallery.matrix[self.order])
+            vector_sq = gallery.sq_norms[self.order]
+        self.vectors = vectors
+        self.vector_sq = vector_sq
+
+    @classmethod
+    def build(cls, gallery, n_lists=0, n_probe=8, iterations=20, seed=0):
+        if n_lists <= 0:
+            n_lists = max(1, int(np.sqrt(len(gallery))))
+        centroids = kmeans(gallery.matrix, n_lists, iterations=iterations, seed=seed)
+        assign = _nearest(gallery.matrix, centroids)
+        order = np.argsort(assign, kind="stable")
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=len(centroids)))))
+        return cls(gallery, centroids, order, offsets, n_probe)
+
+    def search(self, queries, k=1):
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.centroids.shape[1])
+        k = min(k, len(self.order))
+        rows_out = np.full((len(queries), k), -1, dtype=np.int64)
+        dist_out = np.full((len(queries), k), np.inf, dtype=np.float32)
+
+        c_d2 = self.centroid_sq[None, :] - 2.0 * (queries @ self.centroids.T)
+        n_probe = self.n_probe
+        if n_probe < len(self.centroids):
+            probes = np.argpartition(c_d2, n_probe - 1, axis=1)[:, :n_probe]
+        else:
+            probes = np.broadcast_to(np.arange(len(self.centroids)), c_d2.shape)
+
+        for q, (query, lists) in enumerate(zip(queries, probes)):
+            q_sq = float(query @ query)
+            d2_parts, row_parts = [], []
+            for l in lists:
+                start, end = self.offsets[l], self.offsets[l + 1]
+                if start == end:
+                    continue
+                # Each list is a contiguous slice: no gather copy of the vectors
+                d2_parts.append(self.vector_sq[start:end] - 2.0 * (self.vectors[start:end] @ query))
+                row_parts.append(self.order[start:end])
+            if not d2_parts:
+                continue
+            d2 = np.concatenate(d2_parts) + q_sq
+            cand_rows = np.concatenate(row_parts)
+            np.maximum(d2, 0.0, out=d2)
+            kk = min(k, len(d2))
+            top = np.argpartition(d2, kk - 1)[:kk] if kk < len(d2) else np.arange(len(d2))
+            top = top[np.argsort(d2[top])]
+            rows_out[q, :kk] = cand_rows[top]
+            dist_out[q, :kk] = np.sqrt(d2[top])
+        return rows_out, dist_out
+
+    def save(self, path):
+        np.savez(
+            path, kind=self.kind, centroids=self.centroids, order=self.order, offsets=self.offsets,
+            n_probe=self.n_probe, fingerprint=gallery_fingerprint(self.gallery.matrix),
+        )
+
+
+def build_index(gallery, kind="ivf", n_lists=0, n_probe=8):
+    if kind == "ivf" and len(gallery) > 0:
+        return IVFIndex.build(gallery, n_lists=n_lists, n_probe=n_probe)
+    return BruteForceIndex(gallery)
+
+
+def load_index(gallery, path, kind="auto", n_probe=None):
+    # kind: "flat" forces exact search, "ivf"/"auto" use the saved index when it
+    # matches this gallery ("ivf" warns when it can't)
+    if kind == "flat" or not os.path.exists(path):
+        if kind == "ivf":
+            print(f"[WARN] No gallery index at {path}, using exact search")
+        return BruteForceIndex(gallery)
+    try:
+        data = np.load(path)
+        fingerprint = data["fingerprint"]
+        expected = gallery_fingerprint(gallery.matrix)
+        if fingerprint.shape != expected.shape or not np.allclose(fingerprint, expected):
+            print(f"[WARN] Gallery index {path} is out of date, using exact search")
+            return BruteForceIndex(gallery)
+        probe = int(data["n_probe"]) if n_probe is None else n_probe
+        return IVFIndex(gallery, data["centroids"], data["order"], data["offsets"], probe)
+    except Exception as e:
+        print(f"[WARN] Failed to load gallery index {path}: {e}")
+        return BruteForceIndex(gallery)
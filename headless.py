@@ -0,0 +1,216 @@
+"""Run recognition and attendance without the GUI.
+
+    python headless.py --source 0
+    python headless.py --source recordings/gate.mp4 --jsonl results.jsonl --no-write
+    python headless.py --source frames/ --fps 15 --start "2026-03-14 09:00:00"
+
+--source is a camera index, a video file or a directory of images (read in
+name order). Frames are processed as fast as they can be read; for files
+and directories the clock follows the media (frame timestamps from --start),
+so blink timeouts and the attendance window behave as they would have live.
+
+Attendance events go to --events (stdout by default) and per-frame results
+to --jsonl, both as JSON lines. Throughput is reported on stderr every
+--report-every seconds and at the end. --profile profiles the whole run
+into the diagnostics folder, as the kiosk's Ctrl+Alt+Shift+P does.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import cv2
+
+from capture import FrameGrabber
+from engine import AttendanceEngine
+from gallery import Gallery
+from metrics import StageMetrics
+from profiler import ProfileSession
+from recognition import RecognitionPipeline
+from settings import ENCODINGS_PATH, ENCODER_EXECUTOR, CAMERA_WIDTH, CAMERA_HEIGHT
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def camera_frames(index, width=CAMERA_WIDTH, height=CAMERA_HEIGHT):
+    # Newest frame wins, as in the kiosk; the clock is the wall clock
+    grabber = FrameGrabber(index, width, height)
+    grabber.start()
+    seq = 0
+    try:
+        while True:
+            # On timeout latest() hands back the frame already yielded
+            new_seq, frame = grabber.latest(after_seq=seq, timeout=1.0)
+            if frame is not None and new_seq != seq:
+                seq = new_seq
+                yield seq, frame, None
+    finally:
+        grabber.stop()
+
+
+def video_frames(path, fps):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise OSError(f"cannot open video {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or fps
+    seq = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                return
+            seq += 1
+            yield seq, frame, (seq - 1) / fps
+    finally:
+        cap.release()
+
+
+def directory_frames(path, fps):
+    names = sorted(name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTS))
+    for i, name in enumerate(names):
+        frame = cv2.imread(os.path.join(path, name))
+        if frame is None:
+            print(f"[WARN] Skipping unreadable image {name}", file=sys.stderr)
+            continue
+        yield i + 1, frame, i / fps
+
+
+def open_source(source, fps):
+    if source.isdigit():
+        return camera_frames(int(source))
+    if os.path.isdir(source):
+        return directory_frames(source, fps)
+    return video_frames(source, fps)
+
+
+def _json_default(value):
+    # numpy scalars and datetimes
+    if hasattr(value, "item"):
+        return value.item()
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ", timespec="seconds")
+    return str(value)
+
+
+def write_line(stream, record):
+    if stream is not None:
+        stream.write(json.dumps(record, default=_json_default) + "\n")
+        stream.flush()
+
+
+def open_output(path):
+    if not path:
+        return None
+    return sys.stdout if path == "-" else open(path, "w")
+
+
+class Throughput:
+    """Frame rate overall and over the last reporting interval.
+
+    The first frame is left out of the sustained rate: it pays for model
+    loading and warm-up, which says nothing about steady-state speed.
+    """
+
+    def __init__(self, report_every):
+        self.report_every = report_every
+        self.frames = 0
+        self.first = None
+        self.mark = None
+        self.mark_frames = 0
+
+    def tick(self):
+        now = time.perf_counter()
+        self.frames += 1
+        if self.first is None:
+            self.first = self.mark = now
+            return
+        if self.report_every and now - self.mark >= self.report_every:
+            recent = (self.frames - self.mark_frames) / (now - self.mark)
+            print(f"[INFO] {self.frames} frames, {self.sustained():.1f} fps sustained, "
+                  f"{recent:.1f} fps over the last {now - self.mark:.0f} s", file=sys.stderr)
+            self.mark, self.mark_frames = now, self.frames
+
+    def sustained(self):
+        if self.first is None or self.frames < 2:
+            return 0.0
+        return (self.frames - 1) / max(1e-9, time.perf_counter() - self.first)
+
+
+def run(args):
+    gallery = Gallery.load(args.encodings)
+    live = args.source.isdigit()
+    # Recorded input is encoded in-loop so results don't depend on machine speed
+    encoder = args.encoder or (ENCODER_EXECUTOR if live else "inline")
+    pipeline = RecognitionPipeline(gallery, encoder=encoder)
+    metrics = StageMetrics()
+    engine = AttendanceEngine(write=not args.no_write, metrics=metrics)
+    start = datetime.strptime(args.start, "%Y-%m-%d %H:%M:%S") if args.start else datetime.now()
+
+    events = open_output(args.events)
+    results = open_output(args.jsonl)
+    throughput = Throughput(args.report_every)
+    marked = 0
+    profile = ProfileSession("headless", focus=("process", "handle_result")) if args.profile else None
+    if profile is not None:
+        profile.start()
+    try:
+        for seq, frame, offset in open_source(args.source, args.fps):
+            now = datetime.now() if offset is None else start + timedelta(seconds=offset)
+            result = pipeline.process(seq, frame)
+            if result is None:
+                continue
+            metrics.add(result["timings"])
+            with metrics.time("attendance"):
+                updates = engine.handle_result(result, now=now)
+            faces = []
+            for update in updates:
+                faces.append(dict(update["face"], status=update["status"], blinks=update["blinks"]))
+                event = update["event"]
+                if event is not None:
+                    marked += event["type"] == "marked"
+                    write_line(events, {"seq": seq, "type": event["type"],
+                                        "student_id": event["student_id"], "time": event["time"]})
+            write_line(results, {"seq": seq, "time": now, "faces": faces, "timings": result["timings"]})
+            throughput.tick()
+            if args.max_frames and throughput.frames >= args.max_frames:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if profile is not None:
+            for path in profile.stop():
+                print(f"[INFO] Profile written to {path}", file=sys.stderr)
+        pipeline.close()
+        engine.close()
+        for stream in (events, results):
+            if stream not in (None, sys.stdout):
+                stream.close()
+    print(f"[INFO] Processed {throughput.frames} frames, {throughput.sustained():.1f} fps sustained, "
+          f"{marked} students marked", file=sys.stderr)
+    for line in metrics.overlay_lines()[1:]:
+        print(f"[INFO] {line}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", required=True, help="camera index, video file or directory of images")
+    parser.add_argument("--encodings", default=ENCODINGS_PATH)
+    parser.add_argument("--events", default="-", help="attendance events as JSON lines ('-' = stdout, '' = off)")
+    parser.add_argument("--jsonl", default="", help="per-frame results as JSON lines ('-' = stdout)")
+    parser.add_argument("--fps", type=float, default=25.0,
+                        help="frame rate for image directories and videos that don't report one")
+    parser.add_argument("--start", help="media start time, 'YYYY-MM-DD HH:MM:SS' (default: now)")
+    parser.add_argument("--encoder", choices=("process", "thread", "inline"),
+                        help="where encodings run (default: inline for files, ATTENDANCE_ENCODER for cameras)")
+    parser.add_argument("--no-write", action="store_true", help="report marks without writing attendance")
+    parser.add_argument("--max-frames", type=int, default=0)
+    parser.add_argument("--report-every", type=float, default=5.0, help="seconds between fps reports (0 = off)")
+    parser.add_argument("--profile", action="store_true",
+                        help="profile the run (ATTENDANCE_PROFILE_MODE) into the diagnostics folder")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import face_recognition
+
+from settings import ENCODER_EXECUTOR
+from detection import to_location
+
+# Context kept around each face when it is cut out for the encoder; the
+# aligned chip face_recognition extracts needs a little room past the box
+CROP_MARGIN = 0.5
+
+
+def encode_crops(crops):
+    # crops: [(rgb image, (x1, y1, x2, y2) within it)] -> (one encoding or None each, ms taken)
+    start = time.perf_counter()
+    encodings = []
+    for image, box in crops:
+        found = face_recognition.face_encodings(image, [to_location(box)])
+        encodings.append(found[0] if found else None)
+    return encodings, (time.perf_counter() - start) * 1000.0
+
+
+def crop_face(img_rgb, box, margin=CROP_MARGIN):
+    height, width = img_rgb.shape[:2]
+    x1, y1, x2, y2 = box
+    mx, my = int((x2 - x1) * margin), int((y2 - y1) * margin)
+    cx1, cy1 = max(0, x1 - mx), max(0, y1 - my)
+    cx2, cy2 = min(width, x2 + mx), min(height, y2 + my)
+    # Copy so only the crop, not the whole frame, is pickled to the encoder
+    crop = img_rgb[cy1:cy2, cx1:cx2].copy()
+    return crop, (x1 - cx1, y1 - cy1, x2 - cx1, y2 - cy1)
+
+
+class IdentityEncoder:
+    """Runs face encoding beside the frame loop, one batch at a time.
+
+    submit() hands over the faces of one frame (cropped, so little data
+    crosses to a process) and returns straight away; collect() returns the
+    finished batch as [(track_id, encoding)] on a later frame, or [] while it
+    is still running. Only one batch is in flight; submit() returns False
+    while busy and the caller simply asks again on a later frame.
+
+    "process" runs the encoder in its own spawned process so it doesn't
+    compete for the GIL with landmarks and tracking. Daemonic processes
+    (the per-camera workers) can't have children, so there it falls back to
+    a thread.
+    """
+
+    def __init__(self, executor=ENCODER_EXECUTOR):
+        if executor == "process" and multiprocessing.current_process().daemon:
+            executor = "thread"
+        if executor == "process":
+            self.pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="encoder")
+        self.executor = executor
+        self._future = None
+        self._track_ids = []
+        # Encoder time of the batch collect() last returned
+        self.last_ms = None
+
+    def busy(self):
+        return self._future is not None and not self._future.done()
+
+    def submit(self, img_rgb, faces):
+        # faces: [(track_id, box)] from the same frame
+        if self._future is not None:
+            return False
+        self._track_ids = [track_id for track_id, _ in faces]
+        crops = [crop_face(img_rgb, box) for _, box in faces]
+        self._future = self.pool.submit(encode_crops, crops)
+        return True
+
+    def collect(self):
+        self.last_ms = None
+        if self._future is None or not self._future.done():
+            return []
+        future, self._future = self._future, None
+        try:
+            encodings, self.last_ms = future.result()
+        except Exception as e:
+            print(f"[WARN] Face encoding failed: {e}")
+            return []
+        return [(track_id, encoding) for track_id, encoding in zip(self._track_ids, encodings)
+                if encoding is not None]
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
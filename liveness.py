@@ -0,0 +1,75 @@
+from collections import OrderedDict
+from datetime import timedelta
+
+from settings import LIVENESS_TRACK_TTL, LIVENESS_MAX_TRACKS, LIVENESS_MAX_STUDENTS
+
+
+class LivenessStore:
+    """Blink progress per face track and "already logged" per student, bounded.
+
+    Blinks are counted per track, keyed by (camera, track_id), or by
+    (camera, student_id) when tracking is off, so they belong to the face
+    actually in front of the camera. A track's progress is dropped once it
+    hasn't been seen for ``track_ttl`` seconds, or if it turns out to be a
+    different student.
+
+    Once a student is verified and marked they are remembered as logged for
+    ``window`` (the kiosk's attendance window) and not asked to blink again;
+    after that the entry expires and a student coming back is verified
+    afresh. Both maps are LRU ordered and capped, so memory stays flat on a
+    kiosk that sees thousands of students in a day.
+    """
+
+    def __init__(self, window, track_ttl=LIVENESS_TRACK_TTL,
+                 max_tracks=LIVENESS_MAX_TRACKS, max_students=LIVENESS_MAX_STUDENTS):
+        self.window = window
+        self.track_ttl = timedelta(seconds=track_ttl)
+        self.max_tracks = max(1, max_tracks)
+        self.max_students = max(1, max_students)
+        self.tracks = OrderedDict()
+        self.logged = OrderedDict()
+
+    def track(self, key, student_id, now):
+        # Blink state for this face, created or reset as needed
+        state = self.tracks.pop(key, None)
+        if state is None or state["student_id"] != student_id:
+            state = {"student_id": student_id, "blinks": 0, "eye_closed": False}
+        state["seen"] = now
+        self.tracks[key] = state
+        while len(self.tracks) > self.max_tracks:
+            self.tracks.popitem(last=False)
+        return state
+
+    def peek(self, key):
+        return self.tracks.get(key)
+
+    def is_logged(self, student_id, now):
+        logged_at = self.logged.get(student_id)
+        if logged_at is None:
+            return False
+        if now - logged_at >= self.window:
+            del self.logged[student_id]
+            return False
+        return True
+
+    def mark_logged(self, student_id, now):
+        self.logged.pop(student_id, None)
+        self.logged[student_id] = now
+        while len(self.logged) > self.max_students:
+            self.logged.popitem(last=False)
+        # Progress on any of this student's tracks is spent
+        for key in [key for key, state in self.tracks.items() if state["student_id"] == student_id]:
+            del self.tracks[key]
+
+    def expire(self, now):
+        # Both maps are in last-touched order, so expired entries are at the front
+        while self.tracks:
+            key, state = next(iter(self.tracks.items()))
+            if now - state["seen"] < self.track_ttl:
+                break
+            del self.tracks[key]
+        while self.logged:
+            student_id, logged_at = next(iter(self.logged.items()))
+            if now - logged_at < self.window:
+                break
+            del self.logged[student_id]
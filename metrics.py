@@ -0,0 +1,173 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+from settings import METRICS_WINDOW
+
+# Display order for the overlay and dumps; anything else is listed after these
+STAGES = ("capture", "convert", "resize", "detect", "track", "encode", "match", "landmarks",
+          "attendance", "attendance_write", "render")
+
+
+class StageClock:
+    """Milliseconds spent per stage while processing one frame.
+
+    ``with clock("detect"): ...`` adds the block's wall time to
+    ``timings["detect"]``; a stage entered twice in one frame (e.g. several
+    ROI crops) accumulates. The dict travels back with the result, so
+    stages timed in a worker process end up in the GUI's histograms.
+    """
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def __call__(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] = self.timings.get(stage, 0.0) + (time.perf_counter() - start) * 1000.0
+
+
+def null_clock(stage):
+    return nullcontext()
+
+
+class RollingHistogram:
+    """The last ``size`` samples in a ring buffer; percentiles on demand.
+
+    Recording is a single array store, so it is cheap enough for every
+    frame; the sort only happens when someone asks for percentiles.
+    """
+
+    def __init__(self, size=METRICS_WINDOW):
+        self.samples = np.zeros(max(1, size))
+        self.count = 0
+
+    def record(self, value):
+        self.samples[self.count % len(self.samples)] = value
+        self.count += 1
+
+    def percentiles(self, qs=(50, 95, 99)):
+        filled = self.samples[:min(self.count, len(self.samples))]
+        if not len(filled):
+            return [0.0 for _ in qs]
+        return [float(v) for v in np.percentile(filled, qs)]
+
+
+class RateCounter:
+    # Events per second over the last ``span`` seconds
+    def __init__(self, span=2.0):
+        self.span = span
+        self.times = deque()
+
+    def tick(self, now=None):
+        now = now or time.monotonic()
+        self.times.append(now)
+        while self.times and now - self.times[0] > self.span:
+            self.times.popleft()
+
+    def rate(self):
+        if len(self.times) < 2:
+            return 0.0
+        return (len(self.times) - 1) / max(1e-9, self.times[-1] - self.times[0])
+
+
+class StageMetrics:
+    """Per-stage latency histograms and frame rates for one process.
+
+    Stages are recorded from any thread (the attendance writer, capture);
+    the occasional lost update from unsynchronised ring-buffer writes is an
+    acceptable price for not taking a lock per sample.
+    """
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.window = window
+        self.stages = {}
+        self.rates = {}
+
+    def record(self, stage, ms):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = RollingHistogram(self.window)
+        histogram.record(ms)
+
+    def add(self, timings):
+        for stage, ms in timings.items():
+            self.record(stage, ms)
+
+    def time(self, stage):
+        return _Timed(self, stage)
+
+    def tick(self, name):
+        counter = self.rates.get(name)
+        if counter is None:
+            counter = self.rates[name] = RateCounter()
+        counter.tick()
+
+    def snapshot(self):
+        stages = {}
+        for stage in sorted(list(self.stages), key=lambda s: (STAGES.index(s) if s in STAGES else len(STAGES), s)):
+            histogram = self.stages[stage]
+            p50, p95, p99 = histogram.percentiles()
+            stages[stage] = {"p50": p50, "p95": p95, "p99": p99, "count": histogram.count}
+        return {"fps": {name: counter.rate() for name, counter in list(self.rates.items())}, "stages": stages}
+
+    def overlay_lines(self):
+        snap = self.snapshot()
+        lines = ["  ".join(f"{name} {rate:.1f} fps" for name, rate in sorted(snap["fps"].items())),
+                 f"{'stage':<16}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        for stage, values in snap["stages"].items():
+            lines.append(f"{stage:<16}{values['p50']:7.1f}{values['p95']:7.1f}{values['p99']:7.1f} ms")
+        return lines
+
+    def dump(self, path):
+        # One JSON line per dump, so the file doubles as a time series
+        record = dict(self.snapshot(), time=time.strftime("%Y-%m-%d %H:%M:%S"))
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"[WARN] Failed to write metrics to {path}: {e}")
+
+
+class _Timed:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.stage, (time.perf_counter() - self.start) * 1000.0)
+        return False
+
+
+class MetricsDumper(threading.Thread):
+    # Appends a snapshot to ``path`` every ``interval`` seconds until stopped
+    def __init__(self, metrics, path, interval):
+        super().__init__(daemon=True, name="metrics-dump")
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._closing = threading.Event()
+
+    def run(self):
+        while not self._closing.wait(self.interval):
+            self.metrics.dump(self.path)
+
+    def close(self):
+        self._closing.set()
+        if self.is_alive():
+            self.join(timeout=1.0)
+        self.metrics.dump(self.path)
@@ -1,7 +1,6 @@
 import sys
 import os
 import shutil
-import csv
 import subprocess
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QVBoxLayout, QPushButton,
@@ -9,6 +8,7 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QPixmap, QFont, QIcon
 from PyQt5.QtCore import Qt
+from storage import open_storage
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # os.environ["QT_QPA_PLATFORM"] = "wayland"
 class UploadWindow(QWidget):
@@ -20,6 +20,8 @@ class UploadWindow(QWidget):
         self.uploaded_path = None
         self.target_dir = os.path.abspath(image_dir)
         self.csv_path = os.path.abspath(csv_file)
+        # csv_file only matters for the CSV backend
+        self.storage = open_storage(csv_paths={"students": self.csv_path})
 
         self.setStyleSheet("""
             QWidget {
@@ -180,16 +182,15 @@ class UploadWindow(QWidget):
         shutil.copyfile(self.uploaded_path, new_image_path)
 
         new_entry = [name, uid, program, branch, mobile, gmail, new_image_path]
-        write_header = not os.path.exists(self.csv_path)
-        with open(self.csv_path, mode='a', newline='') as file:
-            writer = csv.writer(file)
-            if write_header:
-                writer.writerow(["Name", "University ID", "Program", "Branch", "Mobile", "Gmail", "Image Path"])
-            writer.writerow(new_entry)
+        self.storage.append_row("students", new_entry)
 
         QMessageBox.information(self, "Success", f"Details saved and photo stored at:\n{new_image_path}")
         self.go_home()
 
+    def closeEvent(self, event):
+        self.storage.close()
+        event.accept()
+
     def go_home(self):
         self.close()
         subprocess.Popen([sys.executable, "adminPanel.py"])  # Launch home screen
@@ -0,0 +1,199 @@
+import os
+import re
+import queue
+import itertools
+import threading
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject, Qt, QSize, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader, QPixmap
+
+from settings import BASE_DIR, PHOTO_CACHE_MB, PHOTO_THUMB_DIR, PHOTO_PRELOAD
+
+PHOTO_EXTS = (".jpg", ".jpeg", ".png")
+
+
+def resolve_photo(student_id, image_path=""):
+    # The students table's Image Path, else the old images/<uid>.<ext> convention
+    if image_path:
+        path = image_path if os.path.isabs(image_path) else os.path.join(BASE_DIR, image_path)
+        if os.path.exists(path):
+            return path
+    for ext in PHOTO_EXTS:
+        path = os.path.join(BASE_DIR, "images", f"{student_id}{ext}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class PhotoCache(QObject):
+    """Small thumbnails of enrolled students' photos for the match panel.
+
+    Photos are decoded on a background thread with QImageReader scaled
+    straight to the panel size (JPEGs decode at reduced resolution, so a
+    12 MP phone photo costs a few milliseconds) and saved as a thumbnail in
+    PHOTO_THUMB_DIR, named after the original's size and mtime, so later
+    runs don't decode the original again unless it changes. The GUI thread
+    turns the decoded images into QPixmaps, which stay in an LRU bounded by
+    ``max_bytes``.
+
+    get() never touches the disk: it returns the pixmap or None and queues
+    a load, after which photo_ready(student_id) fires. preload() queues
+    every enrolled student at low priority; on-demand loads jump the queue.
+    revalidate() re-checks the cached photos' originals in the background
+    and reloads any that were replaced.
+    """
+
+    photo_ready = pyqtSignal(str)
+    _decoded = pyqtSignal(str, object, object)
+
+    def __init__(self, size=QSize(510, 500), max_bytes=PHOTO_CACHE_MB * 1024 * 1024,
+                 thumb_dir=PHOTO_THUMB_DIR, parent=None):
+        super().__init__(parent)
+        self.size = size
+        self.max_bytes = max(0, max_bytes)
+        self.thumb_dir = thumb_dir
+        self.pixmaps = OrderedDict()
+        # (path, mtime_ns, size) of the original each pixmap was made from
+        self.sources = {}
+        self.bytes = 0
+        self.image_paths = {}
+        self._requested = set()
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._decoded.connect(self._store)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="photo-cache")
+        self._thread.start()
+
+    def get(self, student_id):
+        pixmap = self.pixmaps.get(student_id)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(student_id)
+            return pixmap
+        self.request(student_id)
+        return None
+
+    def request(self, student_id, keep=True, priority=0):
+        if keep and student_id in self._requested:
+            return
+        if keep:
+            self._requested.add(student_id)
+        self._queue.put((priority, next(self._order), student_id, self.image_paths.get(student_id, ""), keep, None))
+
+    def revalidate(self):
+        # Students changed somewhere (a photo may have been re-uploaded):
+        # reload cached photos whose original is no longer the same file
+        for student_id in self.pixmaps:
+            self._queue.put((1, next(self._order), student_id, self.image_paths.get(student_id, ""), True,
+                             self.sources.get(student_id)))
+
+    def preload(self, headers, rows):
+        # Rows of the students table. Every photo gets a thumbnail on disk;
+        # only as many as the LRU holds are kept in memory
+        if not PHOTO_PRELOAD or "University ID" not in headers:
+            return
+        uid_col = headers.index("University ID")
+        path_col = headers.index("Image Path") if "Image Path" in headers else None
+        room = self.max_bytes // max(1, self.size.width() * self.size.height() * 4)
+        for i, row in enumerate(rows):
+            student_id = row[uid_col].strip() if len(row) > uid_col else ""
+            if not student_id:
+                continue
+            if path_col is not None and len(row) > path_col:
+                self.image_paths[student_id] = row[path_col].strip()
+            self.request(student_id, keep=i < room, priority=1)
+
+    def invalidate(self, student_id):
+        pixmap = self.pixmaps.pop(student_id, None)
+        if pixmap is not None:
+            self.bytes -= self._cost(pixmap)
+        self.sources.pop(student_id, None)
+        self._requested.discard(student_id)
+
+    def _cost(self, pixmap):
+        return pixmap.width() * pixmap.height() * 4
+
+    def _store(self, student_id, image, source):
+        # GUI thread: QPixmaps can only be created here
+        self._requested.discard(student_id)
+        if image is None:
+            if student_id in self.pixmaps:
+                # The photo was removed or can no longer be decoded
+                self.invalidate(student_id)
+                self.photo_ready.emit(student_id)
+            return
+        pixmap = QPixmap.fromImage(image)
+        self.invalidate(student_id)
+        self.pixmaps[student_id] = pixmap
+        self.sources[student_id] = source
+        self.bytes += self._cost(pixmap)
+        while self.bytes > self.max_bytes and len(self.pixmaps) > 1:
+            old_id, old = self.pixmaps.popitem(last=False)
+            self.sources.pop(old_id, None)
+            self.bytes -= self._cost(old)
+        self.photo_ready.emit(student_id)
+
+    def _run(self):
+        while True:
+            _, _, student_id, image_path, keep, known = self._queue.get()
+            if student_id is None:
+                return
+            source, image = None, None
+            try:
+                source = self._source(student_id, image_path)
+                if known is not None and source == known:
+                    continue
+                if source is not None:
+                    image = self._load(student_id, source)
+            except Exception as e:
+                print(f"[WARN] Failed to load photo for {student_id}: {e}")
+            if keep:
+                self._decoded.emit(student_id, image, source)
+
+    def _source(self, student_id, image_path):
+        path = resolve_photo(student_id, image_path)
+        if path is None:
+            return None
+        st = os.stat(path)
+        return path, st.st_mtime_ns, st.st_size
+
+    def _thumb_prefix(self, student_id):
+        # "@" never survives the substitution, so one student's prefix can't match another's
+        return re.sub(r"[^\w.-]", "_", student_id) + "@"
+
+    def _thumb_path(self, student_id, source):
+        _, mtime_ns, size = source
+        return os.path.join(self.thumb_dir, f"{self._thumb_prefix(student_id)}{size:x}-{mtime_ns:x}.jpg")
+
+    def _load(self, student_id, source):
+        thumb = self._thumb_path(student_id, source)
+        if os.path.exists(thumb):
+            image = QImage(thumb)
+            if not image.isNull():
+                return image
+
+        path = source[0]
+        reader = QImageReader(path)
+        # Phone photos are usually stored sideways with an EXIF rotation
+        reader.setAutoTransform(True)
+        full = reader.size()
+        if full.isValid() and (full.width() > self.size.width() or full.height() > self.size.height()):
+            reader.setScaledSize(full.scaled(self.size, Qt.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull():
+            print(f"[WARN] Could not decode {path}: {reader.errorString()}")
+            return None
+        try:
+            os.makedirs(self.thumb_dir, exist_ok=True)
+            image.save(thumb, "JPG", 90)
+            # Thumbnails of the photo this one replaced
+            prefix = self._thumb_prefix(student_id)
+            for name in os.listdir(self.thumb_dir):
+                if name.startswith(prefix) and name != os.path.basename(thumb):
+                    os.remove(os.path.join(self.thumb_dir, name))
+        except OSError as e:
+            print(f"[WARN] Could not save thumbnail for {student_id}: {e}")
+        return image
+
+    def close(self):
+        self._queue.put((-1, next(self._order), None, "", False, None))
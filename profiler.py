@@ -0,0 +1,279 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+from settings import DIAGNOSTICS_DIR, PROFILE_ON_START, PROFILE_SECONDS, PROFILE_MODE, PROFILE_SAMPLE_MS
+
+PROFILE_KEYS = "Ctrl+Alt+Shift+P"
+TOP_FUNCTIONS = 25
+
+# Only one session per process: cProfile can't be stacked
+_active = None
+_autostarted = False
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """Samples every thread's Python stack each ``interval`` seconds.
+
+    Much cheaper than cProfile for code that spends its time in a few hot
+    calls, and it sees all threads rather than only the one that started
+    it. Stacks are counted in collapsed form ("thread;outer;...;inner"),
+    which flamegraph.pl and speedscope read directly.
+
+    Samples can only be taken when the GIL is free, so tight pure-Python
+    loops are under-counted next to calls into OpenCV/dlib/Qt; cProfile's
+    numbers are the check on that, hence PROFILE_MODE "both" by default.
+    """
+
+    def __init__(self, interval):
+        super().__init__(daemon=True, name="profile-sampler")
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self._closing = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self._closing.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._closing.set()
+        if self.is_alive():
+            self.join(timeout=1.0)
+
+    def write_collapsed(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def focus_lines(self, name, top=TOP_FUNCTIONS):
+        # Share of samples with ``name`` on the stack, and the innermost frames they ended in
+        prefix = name + " ("
+        thread_totals = Counter()
+        focus_totals = Counter()
+        leaves = Counter()
+        for stack, count in self.counts.items():
+            frames = stack.split(";")
+            thread_totals[frames[0]] += count
+            if any(frame.startswith(prefix) for frame in frames[1:]):
+                focus_totals[frames[0]] += count
+                leaves[frames[-1]] += count
+        if not focus_totals:
+            return [f"{name}: never on the stack in {self.samples} samples"]
+        lines = []
+        for thread, count in focus_totals.most_common():
+            lines.append(f"{name}: on the stack in {count} of {thread_totals[thread]} {thread} samples "
+                         f"({100.0 * count / thread_totals[thread]:.1f}%)")
+        lines.append("  innermost Python frames while inside it:")
+        total = sum(focus_totals.values())
+        for leaf, count in leaves.most_common(top):
+            lines.append(f"    {100.0 * count / total:6.1f}% {count:7d}  {leaf}")
+        return lines
+
+
+def _stats_text(stats, sort, top):
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats(sort).print_stats(top)
+    return stream.getvalue()
+
+
+def profile_focus_lines(stats, name, top=TOP_FUNCTIONS):
+    # Calls and time of ``name`` from cProfile, broken down by what it calls
+    roots = [func for func in stats.stats if func[2] == name]
+    if not roots:
+        return [f"{name}: not called while profiling"]
+    children = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller in callers:
+            children.setdefault(caller, []).append(func)
+
+    lines = []
+    for root in roots:
+        _, calls, own, total, _ = stats.stats[root]
+        lines.append(f"{pstats.func_std_string(root)}: {calls} calls, {total * 1000:.1f} ms total, "
+                     f"{total * 1000 / max(calls, 1):.2f} ms per call, {own * 1000:.1f} ms in its own body")
+
+        # Per caller edge, so this is exactly the time spent on behalf of ``name``
+        lines.append("  direct callees, time spent under it:")
+        direct = sorted(children.get(root, []), key=lambda func: -stats.stats[func][4][root][3])
+        for func in direct[:top]:
+            edge = stats.stats[func][4][root]
+            lines.append(f"    {edge[3] * 1000:9.1f} ms {edge[0]:7d} calls  {pstats.func_std_string(func)}")
+
+        beneath = set()
+        pending = list(children.get(root, []))
+        while pending:
+            func = pending.pop()
+            if func in beneath or func == root:
+                continue
+            beneath.add(func)
+            pending.extend(children.get(func, []))
+        lines.append("  hottest functions anywhere beneath it, own time (includes calls from elsewhere):")
+        for func in sorted(beneath, key=lambda func: -stats.stats[func][2])[:top]:
+            lines.append(f"    {stats.stats[func][2] * 1000:9.1f} ms {stats.stats[func][1]:7d} calls  "
+                         f"{pstats.func_std_string(func)}")
+    return lines
+
+
+class ProfileSession:
+    """Profiles this process for a fixed window and writes the results.
+
+    ``mode`` is "cprofile", "sample" or "both". cProfile records every call
+    but only on the thread that called start(), which for the kiosk is the
+    GUI thread where update_frame runs; the sampler covers every thread.
+    Recognition in worker processes is not seen either way (run headless.py
+    with --profile for the pipeline itself).
+
+    stop() writes ``<name>-<time>.pstats``, ``.collapsed`` and
+    ``-summary.txt`` into ``directory`` and returns their paths. The summary
+    lists the top functions overall and, for each name in ``focus``, where
+    its time went.
+    """
+
+    def __init__(self, name, mode=PROFILE_MODE, directory=DIAGNOSTICS_DIR, focus=(),
+                 sample_ms=PROFILE_SAMPLE_MS):
+        if mode not in ("cprofile", "sample", "both"):
+            raise ValueError(f"unknown profile mode {mode!r}")
+        self.name = name
+        self.mode = mode
+        self.directory = directory
+        self.focus = tuple(focus)
+        self.sample_ms = sample_ms
+        self.profile = None
+        self.sampler = None
+        self.started = None
+
+    @property
+    def running(self):
+        return _active is self
+
+    def start(self):
+        global _active
+        if _active is not None:
+            print("[WARN] A profile is already running in this process")
+            return False
+        _active = self
+        self.started = time.perf_counter()
+        if self.mode in ("sample", "both"):
+            self.sampler = StackSampler(self.sample_ms / 1000.0)
+            self.sampler.start()
+        if self.mode in ("cprofile", "both"):
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        return True
+
+    def stop(self):
+        global _active
+        if _active is not self:
+            return []
+        if self.profile is not None:
+            self.profile.disable()
+        if self.sampler is not None:
+            self.sampler.stop()
+        _active = None
+        try:
+            return self.write(time.perf_counter() - self.started)
+        except OSError as e:
+            print(f"[WARN] Failed to write profile to {self.directory}: {e}")
+            return []
+
+    def write(self, elapsed):
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, f"{self.name}-{time.strftime('%Y%m%d-%H%M%S')}")
+        paths = []
+        summary = [f"{self.name}: {self.mode} profile of {elapsed:.1f} s, pid {os.getpid()}", ""]
+
+        if self.sampler is not None:
+            self.sampler.write_collapsed(base + ".collapsed")
+            paths.append(base + ".collapsed")
+            summary.append(f"== Stack samples ({self.sampler.samples} every {self.sample_ms:g} ms)")
+            for name in self.focus:
+                summary.extend(self.sampler.focus_lines(name))
+            summary.append("")
+
+        if self.profile is not None:
+            self.profile.dump_stats(base + ".pstats")
+            paths.append(base + ".pstats")
+            stats = pstats.Stats(self.profile)
+            summary.append("== cProfile (calling thread only)")
+            for name in self.focus:
+                summary.extend(profile_focus_lines(stats, name))
+            summary.append("")
+            summary.append(_stats_text(stats, "cumulative", TOP_FUNCTIONS))
+            summary.append(_stats_text(stats, "tottime", TOP_FUNCTIONS))
+
+        with open(base + "-summary.txt", "w") as f:
+            f.write("\n".join(summary) + "\n")
+        paths.append(base + "-summary.txt")
+        return paths
+
+
+class ProfilerHotkey:
+    """Hidden profiling switch for a Qt window.
+
+    PROFILE_KEYS starts a PROFILE_SECONDS session (pressing it again ends
+    it early); with PROFILE_ON_START the first window in the process starts
+    one straight away. finish() writes a running session out, for windows
+    that close before the time is up.
+    """
+
+    def __init__(self, widget, name, focus=(), seconds=PROFILE_SECONDS):
+        global _autostarted
+        from PyQt5.QtCore import Qt, QTimer
+        from PyQt5.QtGui import QKeySequence
+        from PyQt5.QtWidgets import QShortcut
+
+        self.name = name
+        self.focus = focus
+        self.seconds = seconds
+        self.session = None
+        self.shortcut = QShortcut(QKeySequence(PROFILE_KEYS), widget)
+        self.shortcut.setContext(Qt.ApplicationShortcut)
+        self.shortcut.activated.connect(self.toggle)
+        self.timer = QTimer(widget)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.finish)
+        if PROFILE_ON_START and not _autostarted:
+            _autostarted = True
+            self.toggle()
+
+    def toggle(self):
+        if self.session is not None and self.session.running:
+            self.finish()
+            return
+        try:
+            self.session = ProfileSession(self.name, focus=self.focus)
+        except ValueError as e:
+            print(f"[WARN] Not profiling: {e}")
+            return
+        if self.session.start():
+            print(f"[INFO] Profiling {self.name} for {self.seconds:g} s")
+            self.timer.start(int(self.seconds * 1000))
+
+    def finish(self):
+        self.timer.stop()
+        if self.session is None or not self.session.running:
+            return
+        for path in self.session.stop():
+            print(f"[INFO] Profile written to {path}")
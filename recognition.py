@@ -0,0 +1,209 @@
+import threading
+import time
+
+import cv2
+import face_recognition
+import dlib
+from imutils import face_utils
+from scipy.spatial import distance
+
+from settings import (
+    MATCH_THRESHOLD, PREDICTOR_PATH, TRACKING_ENABLED,
+    IDENTITY_REFRESH_SECONDS, IDENTITY_MIN_IOU, TRACKER_REFRESH_QUALITY, ENCODER_EXECUTOR
+)
+from detection import FaceDetector, to_location
+from identity_encoder import IdentityEncoder
+from tracking import FaceTracker, box_iou
+from metrics import StageClock
+
+
+def eye_aspect_ratio(eye):
+    A = distance.euclidean(eye[1], eye[5])
+    B = distance.euclidean(eye[2], eye[4])
+    C = distance.euclidean(eye[0], eye[3])
+    return (A + B) / (2.0 * C)
+
+
+class RecognitionPipeline:
+    """Detection, matching and eye-aspect-ratio for a single frame.
+
+    Has no Qt dependency so it can run in a worker thread or process. The
+    result is a plain dict tagged with the frame sequence number:
+
+        {"seq": 12, "faces": [{"track_id": 3, "box": (x1, y1, x2, y2),
+                               "student_id": "...", "distance": 0.31,
+                               "ear": 0.27}, ...],
+         "timings": {"convert": 0.4, "detect": 11.2, ...}}
+
+    ``student_id`` is None for faces above the match threshold; ``ear`` is
+    only computed for matched faces and is None otherwise. ``timings`` holds
+    the milliseconds each stage took on this frame (see metrics.StageClock).
+
+    With tracking enabled the pipeline is stateful: full detection only runs
+    every few frames and faces are followed by FaceTracker in between, so
+    ``track_id`` stays stable while a face is on screen (it is None when
+    tracking is off). Frames must then arrive in order; process() returns
+    None for a frame older than one it has already seen.
+
+    Identities are cached per track: a tracked face is only re-encoded every
+    IDENTITY_REFRESH_SECONDS, or earlier if its box jumps or the tracker's
+    confidence drops. Landmarks and EAR are still computed on every frame.
+
+    Unless ``encoder`` is "inline", tracked faces are encoded by an
+    IdentityEncoder beside the frame loop: a frame only submits the faces
+    that need an identity and picks up whatever batch finished since, so
+    tracking and EAR run at the camera's rate instead of waiting ~100 ms per
+    face for dlib. A new face is reported once its first encoding is in.
+    Without tracking there is nothing to carry an identity between frames
+    and encoding stays in-loop.
+    """
+
+    def __init__(self, gallery, predictor_path=PREDICTOR_PATH, threshold=MATCH_THRESHOLD,
+                 tracking=TRACKING_ENABLED, encoder=ENCODER_EXECUTOR):
+        self.gallery = gallery
+        self.threshold = threshold
+        self.predictor = dlib.shape_predictor(predictor_path)
+        self.detector = FaceDetector()
+        self.tracker = FaceTracker() if tracking else None
+        self.encoder = IdentityEncoder(encoder) if tracking and encoder != "inline" else None
+        self._recent_boxes = []
+        self.identities = {}
+        self._lock = threading.Lock()
+        self._last_seq = 0
+
+    def process(self, seq, img):
+        if self.tracker is None:
+            return self._process(seq, img)
+        with self._lock:
+            if seq <= self._last_seq:
+                return None
+            self._last_seq = seq
+            return self._process(seq, img)
+
+    def _process(self, seq, img):
+        clock = StageClock()
+        with clock("convert"):
+            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+        if self.tracker is None:
+            boxes = self.detector.detect(img_rgb, self._recent_boxes, clock)
+            self._recent_boxes = boxes
+            tracks = [(None, box) for box in boxes]
+        elif self.tracker.needs_detection():
+            # Search around tracked faces and where lost ones were last seen
+            hints = [track["box"] for track in self.tracker.tracks.values()] + self.tracker.lost_boxes
+            boxes = self.detector.detect(img_rgb, hints, clock)
+            with clock("track"):
+                tracks = self.tracker.reconcile(gray, boxes)
+        else:
+            with clock("track"):
+                tracks = self.tracker.update(gray)
+
+        now = time.monotonic()
+        identities = [None] * len(tracks)
+        if self.encoder is not None:
+            done = self.encoder.collect()
+            if self.encoder.last_ms is not None:
+                # Measured where the encoder ran, not the time spent waiting for it
+                clock.timings["encode"] = self.encoder.last_ms
+            if done:
+                with clock("match"):
+                    self._collect_identities(tracks, done, now)
+        pending = [i for i, (track_id, box) in enumerate(tracks) if self._needs_encoding(track_id, box, now)]
+        if self.encoder is not None:
+            # Hand the faces to the encoder if it is free; their identities arrive on a later frame
+            if pending and not self.encoder.busy():
+                self.encoder.submit(img_rgb, [tracks[i] for i in pending])
+            pending = []
+        if pending:
+            # Encode from the full-resolution frame so small, distant faces keep their detail
+            with clock("encode"):
+                encodings = face_recognition.face_encodings(img_rgb, [to_location(tracks[i][1]) for i in pending])
+            # Every face that needs an identity is matched in one batched pass
+            with clock("match"):
+                matches = self.match(encodings)
+        else:
+            matches = []
+        for i, (student_id, face_distance) in zip(pending, matches):
+            track_id, box = tracks[i]
+            identities[i] = {"student_id": student_id, "distance": face_distance, "box": box, "encoded_at": now}
+            if track_id is not None:
+                self.identities[track_id] = identities[i]
+
+        # Forget identities of tracks that are gone
+        live = {track_id for track_id, _ in tracks}
+        for track_id in list(self.identities):
+            if track_id not in live:
+                del self.identities[track_id]
+
+        faces = []
+        for i, (track_id, box) in enumerate(tracks):
+            identity = identities[i] or self.identities.get(track_id)
+            if identity is None:
+                continue
+            face = {"track_id": track_id, "box": box, "student_id": identity["student_id"],
+                    "distance": identity["distance"], "ear": None}
+            faces.append(face)
+            if face["student_id"] is not None:
+                # The same detection box, scaled back to full resolution, drives the
+                # landmark predictor; no second detector pass over the full frame
+                with clock("landmarks"):
+                    face["ear"] = self.eye_aspect(gray, box)
+
+        return {"seq": seq, "faces": faces, "timings": clock.timings}
+
+    def _collect_identities(self, tracks, done, now):
+        # Fold in the encoder's last batch for tracks that are still on screen
+        boxes = dict(tracks)
+        done = [(track_id, encoding) for track_id, encoding in done if track_id in boxes]
+        matches = self.match([encoding for _, encoding in done])
+        for (track_id, _), (student_id, face_distance) in zip(done, matches):
+            self.identities[track_id] = {"student_id": student_id, "distance": face_distance,
+                                         "box": boxes[track_id], "encoded_at": now}
+
+    def _needs_encoding(self, track_id, box, now):
+        if track_id is None:
+            return True
+        identity = self.identities.get(track_id)
+        if identity is None or now - identity["encoded_at"] >= IDENTITY_REFRESH_SECONDS:
+            return True
+        if box_iou(identity["box"], box) < IDENTITY_MIN_IOU:
+            return True
+        quality = self.tracker.tracks[track_id]["quality"]
+        return quality is not None and quality < TRACKER_REFRESH_QUALITY
+
+    def match(self, encodings):
+        results = []
+        for candidates in self.gallery.match(encodings):
+            if not candidates:
+                results.append((None, float("inf")))
+                continue
+            student_id, face_distance = candidates[0]
+            results.append((student_id if face_distance < self.threshold else None, face_distance))
+        return results
+
+    def eye_aspect(self, gray, box):
+        x1, y1, x2, y2 = box
+        shape = self.predictor(gray, dlib.rectangle(int(x1), int(y1), int(x2), int(y2)))
+        shape_np = face_utils.shape_to_np(shape)
+        left_eye = shape_np[42:48]
+        right_eye = shape_np[36:42]
+        return (eye_aspect_ratio(left_eye) + eye_aspect_ratio(right_eye)) / 2.0
+
+    def close(self):
+        if self.encoder is not None:
+            self.encoder.shutdown()
+
+
+# Process-pool entry points: each worker process builds its own pipeline once.
+_worker_pipeline = None
+
+
+def init_worker(gallery, predictor_path=PREDICTOR_PATH, threshold=MATCH_THRESHOLD):
+    global _worker_pipeline
+    _worker_pipeline = RecognitionPipeline(gallery, predictor_path, threshold)
+
+
+def process_frame(seq, img):
+    return _worker_pipeline.process(seq, img)
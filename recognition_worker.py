@@ -0,0 +1,137 @@
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from camera_process import run_camera
+
+from recognition import RecognitionPipeline, init_worker, process_frame
+from settings import (
+    RECOGNITION_EXECUTOR, RECOGNITION_WORKERS, PREDICTOR_PATH, MATCH_THRESHOLD, TRACKING_ENABLED
+)
+
+
+class RecognitionWorker(QObject):
+    """Runs RecognitionPipeline off the GUI thread and reports back via Qt signals.
+
+    At most ``workers`` frames are in flight; submit() refuses new frames
+    while the pool is saturated so recognition always works on recent frames
+    instead of a growing queue. Results are emitted from the pool thread and
+    delivered to slots on the GUI thread through a queued connection; frames
+    the pipeline rejects as out of order produce no signal.
+    """
+
+    result_ready = pyqtSignal(object)
+
+    def __init__(self, gallery, executor=RECOGNITION_EXECUTOR,
+                 workers=RECOGNITION_WORKERS, parent=None):
+        super().__init__(parent)
+        if TRACKING_ENABLED and executor == "process" and workers > 1:
+            # Trackers live inside the worker; several processes would each follow a
+            # different subset of frames and hand out conflicting track IDs
+            print("[WARN] Tracking needs a single recognition process, ignoring ATTENDANCE_RECOGNITION_WORKERS")
+            workers = 1
+        self.max_in_flight = max(1, workers)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+        if executor == "process":
+            # spawn, not fork: the parent already has Qt and camera threads running
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.max_in_flight,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=(gallery, PREDICTOR_PATH, MATCH_THRESHOLD),
+            )
+            self._process = process_frame
+            self._pipeline = None
+        else:
+            pipeline = self._pipeline = RecognitionPipeline(gallery)
+            self.pool = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="recognition")
+            self._process = pipeline.process
+
+    def submit(self, seq, frame):
+        with self._lock:
+            if self._closed or self._in_flight >= self.max_in_flight:
+                return False
+            self._in_flight += 1
+        future = self.pool.submit(self._process, seq, frame)
+        future.add_done_callback(self._on_done)
+        return True
+
+    def _on_done(self, future):
+        with self._lock:
+            self._in_flight -= 1
+            if self._closed or future.cancelled():
+                return
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"[WARN] Recognition failed: {e}")
+            return
+        if result is not None:
+            self.result_ready.emit(result)
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        if self._pipeline is not None:
+            self._pipeline.close()
+
+
+class CameraWorkerPool(QObject):
+    """One capture + recognition process per camera.
+
+    Each process owns its camera, detector, tracker and dlib models, so
+    throughput grows with the number of cores instead of all cameras
+    sharing one pipeline. Results (with their frames) come back over a
+    single bounded queue that a GUI-thread timer drains; only the newest
+    result per camera is emitted, older ones are stale by then anyway.
+    """
+
+    result_ready = pyqtSignal(object)
+
+    def __init__(self, sources, gallery, width=640, height=480, parent=None):
+        super().__init__(parent)
+        ctx = multiprocessing.get_context("spawn")
+        self._results = ctx.Queue(maxsize=4 * len(sources))
+        self._stop = ctx.Event()
+        self.processes = []
+        for camera, source in enumerate(sources):
+            process = ctx.Process(
+                target=run_camera,
+                args=(camera, source, gallery, self._results, self._stop, width, height),
+                name=f"camera-{camera}",
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self._drain)
+        self.timer.start(10)
+
+    def _drain(self):
+        latest = {}
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            latest[result["camera"]] = result
+        for result in latest.values():
+            self.result_ready.emit(result)
+
+    def shutdown(self):
+        self.timer.stop()
+        self._stop.set()
+        for process in self.processes:
+            process.join(timeout=1.0)
+            if process.is_alive():
+                process.terminate()
+        # Don't block interpreter exit on results nobody will read
+        self._results.cancel_join_thread()
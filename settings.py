@@ -0,0 +1,166 @@
+import os
+
+# Runtime knobs for the kiosk. Every value can be overridden through an
+# ATTENDANCE_* environment variable so deployments don't need code edits.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _env_str(name, default):
+    return os.environ.get(name, default)
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        print(f"[WARN] Invalid integer for {name}, using {default}")
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        print(f"[WARN] Invalid number for {name}, using {default}")
+        return default
+
+
+ENCODINGS_PATH = _env_str("ATTENDANCE_ENCODINGS", os.path.join(BASE_DIR, "EncodeFile.p"))
+PREDICTOR_PATH = _env_str("ATTENDANCE_PREDICTOR", os.path.join(BASE_DIR, "shape_predictor_68_face_landmarks.dat"))
+
+# Set a strict threshold (recommended: 0.45 or lower for better accuracy)
+MATCH_THRESHOLD = _env_float("ATTENDANCE_MATCH_THRESHOLD", 0.45)
+
+# Recognition worker pool. "process" keeps dlib (which holds the GIL) away
+# from the Qt thread entirely; "thread" avoids the start-up cost of spawning.
+RECOGNITION_EXECUTOR = _env_str("ATTENDANCE_RECOGNITION_EXECUTOR", "process")
+RECOGNITION_WORKERS = _env_int("ATTENDANCE_RECOGNITION_WORKERS", 1)
+
+# Detect-then-track: full detection every N frames (or when a tracker loses
+# its face); dlib correlation trackers follow faces in between
+TRACKING_ENABLED = _env_int("ATTENDANCE_TRACKING", 1) == 1
+DETECT_EVERY_N_FRAMES = _env_int("ATTENDANCE_DETECT_EVERY", 5)
+# Peak-to-sidelobe ratio below which a tracker is considered lost
+TRACKER_MIN_QUALITY = _env_float("ATTENDANCE_TRACKER_MIN_QUALITY", 7.0)
+
+# Identity cache: a tracked face is re-encoded at most this often, or sooner
+# if its box jumps (IoU against the box at last encoding drops below
+# IDENTITY_MIN_IOU) or the tracker's confidence sags below TRACKER_REFRESH_QUALITY
+IDENTITY_REFRESH_SECONDS = _env_float("ATTENDANCE_IDENTITY_REFRESH", 1.0)
+IDENTITY_MIN_IOU = _env_float("ATTENDANCE_IDENTITY_MIN_IOU", 0.5)
+TRACKER_REFRESH_QUALITY = _env_float("ATTENDANCE_TRACKER_REFRESH_QUALITY", 10.0)
+
+# With tracking on, encodings are computed beside the frame loop so landmarks
+# and EAR keep up with the camera. "process" gives the encoder its own core
+# (dlib holds the GIL), "thread" shares this one, "inline" encodes in-loop
+ENCODER_EXECUTOR = _env_str("ATTENDANCE_ENCODER", "process")
+
+# Gallery index: "auto" uses the IVF index EncodeGenerator.py saved next to
+# the encodings when it matches them, "flat" forces exact search
+GALLERY_INDEX = _env_str("ATTENDANCE_GALLERY_INDEX", "auto")
+# EncodeGenerator.py only builds an IVF index for galleries at least this big
+IVF_MIN_GALLERY = _env_int("ATTENDANCE_IVF_MIN_GALLERY", 5000)
+# Number of k-means lists (0 = sqrt(N)) and lists probed per query. Raising
+# IVF_PROBE trades latency for recall; 0 keeps the value saved with the index
+IVF_LISTS = _env_int("ATTENDANCE_IVF_LISTS", 0)
+IVF_PROBE = _env_int("ATTENDANCE_IVF_PROBE", 0)
+# Candidate rows an approximate index proposes before exact per-student re-ranking
+IVF_CANDIDATES = _env_int("ATTENDANCE_IVF_CANDIDATES", 32)
+
+# Where students, attendance, admins and login history live: "csv" keeps the
+# original flat files, "sqlite" uses DATABASE_PATH (imported from the CSVs
+# the first time it is opened)
+STORAGE_BACKEND = _env_str("ATTENDANCE_STORAGE", "csv")
+DATABASE_PATH = _env_str("ATTENDANCE_DATABASE", os.path.join(BASE_DIR, "attendance.db"))
+
+# With the csv backend the attendance log can be split into one file per
+# "day" or "month" under ATTENDANCE_DIR ("none" keeps attendance_log.csv).
+# Partitions older than ATTENDANCE_COMPRESS_AFTER_DAYS are gzipped (0 = never)
+ATTENDANCE_PARTITION = _env_str("ATTENDANCE_PARTITION", "none")
+ATTENDANCE_DIR = _env_str("ATTENDANCE_DIR", os.path.join(BASE_DIR, "attendance"))
+ATTENDANCE_COMPRESS_AFTER_DAYS = _env_int("ATTENDANCE_COMPRESS_AFTER_DAYS", 30)
+
+# Blink progress is forgotten once a face has been gone this many seconds.
+# At most this many tracks / recently marked students are remembered
+LIVENESS_TRACK_TTL = _env_float("ATTENDANCE_LIVENESS_TRACK_TTL", 3.0)
+LIVENESS_MAX_TRACKS = _env_int("ATTENDANCE_LIVENESS_MAX_TRACKS", 256)
+LIVENESS_MAX_STUDENTS = _env_int("ATTENDANCE_LIVENESS_MAX_STUDENTS", 4096)
+
+# Match panel photos: thumbnails are cached on disk in PHOTO_THUMB_DIR (not
+# under images/, where EncodeGenerator.py takes every folder for a student) and
+# up to PHOTO_CACHE_MB of them kept in memory; PHOTO_PRELOAD warms both at start
+PHOTO_CACHE_MB = _env_int("ATTENDANCE_PHOTO_CACHE_MB", 64)
+PHOTO_THUMB_DIR = _env_str("ATTENDANCE_PHOTO_THUMB_DIR", os.path.join(BASE_DIR, ".photo_thumbs"))
+PHOTO_PRELOAD = _env_int("ATTENDANCE_PHOTO_PRELOAD", 1) == 1
+
+# Latency instrumentation: rolling per-stage histograms over the last
+# METRICS_WINDOW samples, appended to METRICS_FILE every METRICS_INTERVAL
+# seconds (0 = never). F3 toggles the on-screen overlay; METRICS_OVERLAY=1 starts with it on
+DIAGNOSTICS_DIR = _env_str("ATTENDANCE_DIAGNOSTICS_DIR", os.path.join(BASE_DIR, "diagnostics"))
+METRICS_WINDOW = _env_int("ATTENDANCE_METRICS_WINDOW", 1000)
+METRICS_FILE = _env_str("ATTENDANCE_METRICS_FILE", os.path.join(DIAGNOSTICS_DIR, "metrics.jsonl"))
+METRICS_INTERVAL = _env_float("ATTENDANCE_METRICS_INTERVAL", 60.0)
+METRICS_OVERLAY = _env_int("ATTENDANCE_METRICS_OVERLAY", 0) == 1
+
+# Profiling: Ctrl+Alt+Shift+P in the kiosk or admin panel (or PROFILE_ON_START)
+# profiles the next PROFILE_SECONDS into DIAGNOSTICS_DIR. PROFILE_MODE is
+# "cprofile" (.pstats), "sample" (a stack sample every PROFILE_SAMPLE_MS,
+# as .collapsed flamegraph input) or "both"
+PROFILE_ON_START = _env_int("ATTENDANCE_PROFILE", 0) == 1
+PROFILE_SECONDS = _env_float("ATTENDANCE_PROFILE_SECONDS", 30.0)
+PROFILE_MODE = _env_str("ATTENDANCE_PROFILE_MODE", "both")
+PROFILE_SAMPLE_MS = _env_float("ATTENDANCE_PROFILE_SAMPLE_MS", 5.0)
+
+# Attendance marks are written behind the UI by a background thread, in
+# batches collected for up to ATTENDANCE_FLUSH_INTERVAL seconds. FSYNC is
+# "batch" (each batch forced to disk) or "off" (left to the OS)
+ATTENDANCE_WRITE_QUEUE = _env_int("ATTENDANCE_WRITE_QUEUE", 1024)
+ATTENDANCE_FLUSH_INTERVAL = _env_float("ATTENDANCE_FLUSH_INTERVAL", 0.5)
+ATTENDANCE_FSYNC = _env_str("ATTENDANCE_FSYNC", "batch")
+# A batch that can't be written stays queued and is retried every
+# ATTENDANCE_RETRY_INTERVAL seconds; whatever is still unwritten at shutdown
+# is appended to ATTENDANCE_SPILL_FILE
+ATTENDANCE_RETRY_INTERVAL = _env_float("ATTENDANCE_RETRY_INTERVAL", 5.0)
+ATTENDANCE_SPILL_FILE = _env_str("ATTENDANCE_SPILL_FILE", os.path.join(BASE_DIR, "attendance_unwritten.csv"))
+
+# Worker processes map one published copy of the gallery read-only instead
+# of each unpickling their own. /dev/shm keeps it in RAM where available
+SHARED_GALLERY = _env_int("ATTENDANCE_SHARED_GALLERY", 1) == 1
+SHARED_GALLERY_DIR = _env_str(
+    "ATTENDANCE_SHARED_GALLERY_DIR",
+    "/dev/shm/face-attendance-gallery" if os.path.isdir("/dev/shm") else os.path.join(BASE_DIR, ".shared_gallery"),
+)
+
+# Students can have several encodings; their distance is the "min" over
+# templates or the "mean" of the GALLERY_AGGREGATE_TOP closest ones
+GALLERY_AGGREGATE = _env_str("ATTENDANCE_GALLERY_AGGREGATE", "min")
+GALLERY_AGGREGATE_TOP = _env_int("ATTENDANCE_GALLERY_AGGREGATE_TOP", 3)
+
+# Region-of-interest detection: a full-frame scan at ROI_SCAN_SCALE every
+# ROI_FULL_SCAN_EVERY detection passes (or whenever no face is known), and
+# otherwise higher-resolution scans only of crops around recent faces. Crops
+# extend ROI_MARGIN box-widths around the face, which is resized to about
+# ROI_FACE_SIZE pixels wide
+ROI_DETECTION = _env_int("ATTENDANCE_ROI_DETECTION", 1) == 1
+ROI_FULL_SCAN_EVERY = _env_int("ATTENDANCE_ROI_FULL_SCAN_EVERY", 4)
+ROI_SCAN_SCALE = _env_float("ATTENDANCE_ROI_SCAN_SCALE", 0.25)
+ROI_MARGIN = _env_float("ATTENDANCE_ROI_MARGIN", 0.5)
+ROI_FACE_SIZE = _env_int("ATTENDANCE_ROI_FACE_SIZE", 96)
+
+
+def _camera_sources(value):
+    # "0" -> [0]; "0,1" -> [0, 1]; device indexes and file/stream paths can be mixed
+    sources = []
+    for item in value.split(","):
+        item = item.strip()
+        if item:
+            sources.append(int(item) if item.isdigit() else item)
+    return sources or [0]
+
+
+# Camera sources, comma separated. With more than one, each camera gets its
+# own capture + recognition process and the feeds are shown in a grid
+CAMERA_SOURCES = _camera_sources(_env_str("ATTENDANCE_CAMERAS", "0"))
+CAMERA_WIDTH = _env_int("ATTENDANCE_CAMERA_WIDTH", 640)
+CAMERA_HEIGHT = _env_int("ATTENDANCE_CAMERA_HEIGHT", 480)
@@ -0,0 +1,161 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from gallery import Gallery
+from gallery_index import BruteForceIndex, IVFIndex, gallery_fingerprint
+from settings import SHARED_GALLERY_DIR, IVF_PROBE
+
+# A published gallery is a directory of .npy files that every process maps
+# read-only, so the page cache holds one copy no matter how many workers (or
+# kiosks on the same box) attach. Layout:
+#
+#   <dir>/CURRENT          generation number, swapped atomically with os.replace
+#   <dir>/gen-<N>/         matrix.npy, owners.npy, sq_norms.npy, ids.json and,
+#                          for IVF galleries, the bucket-ordered index arrays
+#
+# Publishing a new generation never touches files that are already mapped;
+# readers notice the new CURRENT and re-attach. Old generations are removed
+# once a newer one exists -- on POSIX, mappings outlive the unlink.
+
+CURRENT_FILE = "CURRENT"
+IVF_ARRAYS = ("centroids", "order", "offsets", "vectors", "vector_sq")
+
+
+def read_generation(directory=SHARED_GALLERY_DIR):
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _generation_dir(directory, generation):
+    return os.path.join(directory, f"gen-{generation}")
+
+
+def publish_gallery(gallery, directory=SHARED_GALLERY_DIR):
+    """Write gallery as the next generation and return its number.
+
+    When the current generation already holds this exact gallery (same
+    encodings, student IDs and row owners) it is reused, so kiosks starting
+    one after another share a single copy.
+    """
+    os.makedirs(directory, exist_ok=True)
+    fingerprint = gallery_fingerprint(gallery.matrix).tolist()
+    current = read_generation(directory)
+    if current is not None:
+        path = _generation_dir(directory, current)
+        try:
+            with open(os.path.join(path, "ids.json")) as f:
+                meta = json.load(f)
+            # Relabelled photos keep the same matrix, so the labels are compared too
+            if (meta["fingerprint"] == fingerprint and meta["index"] == gallery.index.kind
+                    and meta["ids"] == list(gallery.ids)
+                    and np.array_equal(np.load(os.path.join(path, "owners.npy"), mmap_mode="r"), gallery.owners)):
+                return current
+        except (OSError, ValueError, KeyError):
+            pass
+
+    generation = (current or 0) + 1
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=directory)
+    np.save(os.path.join(staging, "matrix.npy"), gallery.matrix)
+    np.save(os.path.join(staging, "owners.npy"), gallery.owners)
+    np.save(os.path.join(staging, "sq_norms.npy"), gallery.sq_norms)
+    meta = {"ids": gallery.ids, "fingerprint": fingerprint, "index": gallery.index.kind}
+    if isinstance(gallery.index, IVFIndex):
+        for name in IVF_ARRAYS:
+            np.save(os.path.join(staging, f"ivf_{name}.npy"), getattr(gallery.index, name))
+        meta["n_probe"] = gallery.index.n_probe
+    with open(os.path.join(staging, "ids.json"), "w") as f:
+        json.dump(meta, f)
+    os.replace(staging, _generation_dir(directory, generation))
+
+    tmp_current = os.path.join(directory, f".{CURRENT_FILE}.tmp")
+    with open(tmp_current, "w") as f:
+        f.write(str(generation))
+    os.replace(tmp_current, os.path.join(directory, CURRENT_FILE))
+
+    for entry in os.listdir(directory):
+        if entry.startswith("gen-") and entry != f"gen-{generation}":
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+    return generation
+
+
+def attach_gallery(directory=SHARED_GALLERY_DIR, generation=None):
+    # Returns (generation, Gallery) backed by read-only memory maps
+    if generation is None:
+        generation = read_generation(directory)
+    if generation is None:
+        raise FileNotFoundError(f"No shared gallery published in {directory}")
+    path = _generation_dir(directory, generation)
+    with open(os.path.join(path, "ids.json")) as f:
+        meta = json.load(f)
+
+    def mapped(name):
+        return np.load(os.path.join(path, name), mmap_mode="r")
+
+    gallery = Gallery(mapped("matrix.npy"), mapped("owners.npy"), meta["ids"], sq_norms=mapped("sq_norms.npy"))
+    if meta["index"] == "ivf":
+        arrays = {name: mapped(f"ivf_{name}.npy") for name in IVF_ARRAYS}
+        gallery.index = IVFIndex(
+            gallery, arrays["centroids"], arrays["order"], arrays["offsets"],
+            IVF_PROBE or meta["n_probe"], vectors=arrays["vectors"], vector_sq=arrays["vector_sq"],
+        )
+    else:
+        gallery.index = BruteForceIndex(gallery)
+    return generation, gallery
+
+
+class SharedGalleryReader:
+    """Stands in for a Gallery inside worker processes.
+
+    Pickles down to the directory path, so handing it to a spawned worker
+    copies nothing; the worker maps the arrays on first use. Every
+    ``check_every`` seconds it looks at CURRENT and re-attaches when a new
+    generation has been published, which lets EncodeGenerator.py swap the
+    gallery under running kiosks.
+    """
+
+    def __init__(self, directory=SHARED_GALLERY_DIR, check_every=1.0):
+        self.directory = directory
+        self.check_every = check_every
+        self.generation = None
+        self._gallery = None
+        self._checked_at = 0.0
+
+    def __getstate__(self):
+        return {"directory": self.directory, "check_every": self.check_every}
+
+    def __setstate__(self, state):
+        self.__init__(state["directory"], state["check_every"])
+
+    @property
+    def gallery(self):
+        now = time.monotonic()
+        if self._gallery is None or now - self._checked_at >= self.check_every:
+            self._checked_at = now
+            generation = read_generation(self.directory)
+            if generation is not None and generation != self.generation:
+                try:
+                    self.generation, self._gallery = attach_gallery(self.directory, generation)
+                except (OSError, ValueError) as e:
+                    # Raced with a newer publish that already removed this generation
+                    print(f"[WARN] Could not attach shared gallery generation {generation}: {e}")
+            if self._gallery is None:
+                raise FileNotFoundError(f"No shared gallery published in {self.directory}")
+        return self._gallery
+
+    def __len__(self):
+        return len(self.gallery)
+
+    @property
+    def student_count(self):
+        return self.gallery.student_count
+
+    def match(self, queries, *args, **kwargs):
+        return self.gallery.match(queries, *args, **kwargs)
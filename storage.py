@@ -0,0 +1,461 @@
+import csv
+import os
+import sqlite3
+from datetime import datetime
+
+from attendance import AttendanceIndex, TIME_FORMAT
+from attendance_log import PartitionedAttendanceLog, MANIFEST_NAME
+from csv_tail import replacing
+from students import StudentDirectory, clean_row
+from settings import (BASE_DIR, STORAGE_BACKEND, DATABASE_PATH,
+                      ATTENDANCE_PARTITION, ATTENDANCE_DIR, ATTENDANCE_COMPRESS_AFTER_DAYS)
+
+# Every table the app keeps, with its CSV file and (header label, SQL column)
+# pairs in the order the CSVs have always used. The login history CSV has no
+# header row.
+TABLES = {
+    "students": {
+        "csv": "students.csv",
+        "columns": [("Name", "name"), ("University ID", "university_id"), ("Program", "program"),
+                    ("Branch", "branch"), ("Mobile", "mobile"), ("Gmail", "gmail"), ("Image Path", "image_path")],
+    },
+    "attendance": {
+        "csv": "attendance_log.csv",
+        "columns": [("Name", "name"), ("University ID", "university_id"), ("Program", "program"),
+                    ("Branch", "branch"), ("Mobile", "mobile"), ("Date", "date"), ("Time", "time")],
+    },
+    "admins": {
+        "csv": "admins.csv",
+        "columns": [("Name", "name"), ("Email", "email"), ("Password", "password")],
+    },
+    "login_history": {
+        "csv": "login_logout_history.csv",
+        "columns": [("Timestamp", "timestamp"), ("Admin Name", "admin_name"), ("Status", "status")],
+        "header": False,
+    },
+}
+
+# Header spellings found in older files
+COLUMN_ALIASES = {"gmail": "email", "email": "gmail", "student id": "university_id"}
+
+CSV_PATHS = {table: os.path.join(BASE_DIR, spec["csv"]) for table, spec in TABLES.items()}
+
+
+def labels(table):
+    return [label for label, _ in TABLES[table]["columns"]]
+
+
+def has_header(table):
+    return TABLES[table].get("header", True)
+
+
+class CsvStorage:
+    """The original flat files. Rewrites replace the whole file; student and
+    attendance lookups go through the in-memory StudentDirectory and
+    AttendanceIndex.
+
+    With ``partition`` set to "day" or "month" the attendance table lives in
+    a PartitionedAttendanceLog under ATTENDANCE_DIR instead of
+    attendance_log.csv; an existing log is split into it once and renamed
+    to attendance_log.csv.migrated.
+    """
+
+    kind = "csv"
+
+    def __init__(self, csv_paths=None, partition=ATTENDANCE_PARTITION, attendance_dir=ATTENDANCE_DIR):
+        self.paths = dict(CSV_PATHS, **(csv_paths or {}))
+        self.partition = partition
+        self.attendance_dir = attendance_dir
+        self._students = None
+        self._attendance = None
+        self.partitions = None
+        if partition in ("day", "month"):
+            self.partitions = PartitionedAttendanceLog(attendance_dir, labels("attendance"), partition)
+            self._import_legacy_log()
+        elif partition != "none":
+            print(f"[WARN] Unknown attendance partitioning {partition!r}, keeping a single log")
+
+    def reopen(self):
+        # A second handle on the same files, for use from another thread
+        return CsvStorage(self.paths, self.partition, self.attendance_dir)
+
+    def _import_legacy_log(self):
+        path = self.paths["attendance"]
+        if not os.path.exists(path):
+            return
+        if self.partitions.keys():
+            print(f"[WARN] {path} exists next to a partitioned log and is ignored")
+            return
+        count = self.partitions.import_log(path)
+        print(f"[INFO] Split {count} attendance rows from {path} into {self.partitions.directory}")
+        os.replace(path, path + ".migrated")
+
+    def _log(self, table):
+        # The partitioned log when it holds this table, else None
+        return self.partitions if table == "attendance" else None
+
+    @property
+    def students(self):
+        if self._students is None:
+            self._students = StudentDirectory(self.paths["students"])
+        return self._students
+
+    @property
+    def attendance(self):
+        if self._attendance is None:
+            if self.partitions is not None:
+                directory = self.partitions.directory
+                self._attendance = AttendanceIndex(directory, path=os.path.join(directory, "index.json"),
+                                                   reader_factory=self.partitions.tail_reader)
+            else:
+                self._attendance = AttendanceIndex(self.paths["attendance"])
+        return self._attendance
+
+    def read_table(self, table):
+        # (headers, rows); headers is empty when there is no data at all
+        if self._log(table):
+            rows = self.partitions.read_range()
+            return (labels(table), rows) if rows else ([], [])
+        path = self.paths[table]
+        if not os.path.exists(path):
+            return [], []
+        with open(path, newline="") as f:
+            rows = list(csv.reader(f))
+        if not has_header(table):
+            return (labels(table), rows) if rows else ([], [])
+        if not rows:
+            return [], []
+        return rows[0], rows[1:]
+
+    def read_attendance(self, start=None, end=None):
+        # Attendance rows with start <= Date <= end ("YYYY-MM-DD", either may be None)
+        if self.partitions is not None:
+            return self.partitions.read_range(start, end)
+        _, rows = self.read_table("attendance")
+        return [row for row in rows if len(row) > 5
+                and (start is None or row[5] >= start) and (end is None or row[5] <= end)]
+
+    def write_table(self, table, headers, rows):
+        if self._log(table):
+            self.partitions.replace_all(rows)
+            return
+        # Replaced, never rewritten in place, so tail readers see the change
+        with replacing(self.paths[table]) as tmp_path, open(tmp_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            if has_header(table):
+                writer.writerow(headers)
+            writer.writerows(rows)
+
+    def append_row(self, table, values):
+        if self._log(table):
+            self.partitions.append_rows([values])
+            return
+        path = self.paths[table]
+        with open(path, "a", newline="") as f:
+            writer = csv.writer(f)
+            if has_header(table) and os.stat(path).st_size == 0:
+                writer.writerow(labels(table))
+            writer.writerow(values)
+
+    def update_row(self, table, position, changes):
+        # changes: {column index: new value} for the position-th data row
+        if self._log(table):
+            self.partitions.update_row(position, changes)
+            return
+        headers, rows = self.read_table(table)
+        for col, value in changes.items():
+            rows[position][col] = value
+        self.write_table(table, headers, rows)
+
+    def delete_row(self, table, position):
+        if self._log(table):
+            self.partitions.delete_row(position)
+            return
+        headers, rows = self.read_table(table)
+        del rows[position]
+        self.write_table(table, headers, rows)
+
+    def clear_table(self, table):
+        if self._log(table):
+            self.partitions.clear()
+            return
+        with replacing(self.paths[table]):
+            pass
+
+    def get_student(self, student_id):
+        return self.students.get(student_id)
+
+    def attendance_summary(self, student_id):
+        return self.attendance.summary(student_id)
+
+    def last_marked(self, student_id):
+        return self.attendance.last_marked(student_id)
+
+    def has_mark(self, student_id, date, time):
+        # Only used to retry failed writes, so a scan of the day is fine
+        return any(len(row) > 6 and row[1].strip() == student_id and row[6].strip() == time
+                   for row in self.read_attendance(date, date))
+
+    def write_attendance(self, rows, window=None, fsync=False):
+        # One append for a whole batch; duplicates were filtered by the caller
+        if self.partitions is not None:
+            self.partitions.append_rows(rows, fsync)
+            return len(rows)
+        path = self.paths["attendance"]
+        with open(path, "a", newline="") as f:
+            writer = csv.writer(f)
+            if os.stat(path).st_size == 0:
+                writer.writerow(labels("attendance"))
+            writer.writerows(rows)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        return len(rows)
+
+    def data_version(self):
+        # Changes whenever students or attendance change on disk
+        version = []
+        attendance_path = self.paths["attendance"]
+        if self.partitions is not None:
+            # Partitions changed by this app always rewrite the manifest
+            attendance_path = os.path.join(self.partitions.directory, MANIFEST_NAME)
+        for path in (self.paths["students"], attendance_path):
+            try:
+                st = os.stat(path)
+                version.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                version.append(None)
+        return tuple(version)
+
+    def maintain(self):
+        # Slow housekeeping, run off the UI thread by the attendance writer
+        if self.partitions is not None:
+            count = self.partitions.compress_older_than(ATTENDANCE_COMPRESS_AFTER_DAYS)
+            if count:
+                print(f"[INFO] Compressed {count} old attendance partitions")
+
+    def close(self):
+        if self._attendance is not None:
+            self._attendance.save()
+
+
+class SqliteStorage:
+    """Everything in one SQLite database in WAL mode.
+
+    Readers never block the kiosk's writes, student and attendance lookups
+    are indexed queries, and attendance batches are re-checked for
+    duplicates inside the IMMEDIATE transaction that inserts them, so
+    several kiosks can't double-mark a student. A new database is filled from the existing CSVs once.
+    """
+
+    kind = "sqlite"
+    SCHEMA_VERSION = 2
+
+    def __init__(self, path=DATABASE_PATH, csv_paths=None):
+        self.path = path
+        self.csv_paths = csv_paths
+        self.conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < self.SCHEMA_VERSION:
+            self._create_schema()
+            if version == 0:
+                # Read the CSVs as they are; the configured partitioning would
+                # split and rename the live log
+                self._migrate(CsvStorage(csv_paths, partition="none"))
+            else:
+                self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def reopen(self):
+        # A second connection to the same database, for use from another thread
+        return SqliteStorage(self.path, self.csv_paths)
+
+    def _create_schema(self):
+        with self.transaction():
+            for table, spec in TABLES.items():
+                columns = ", ".join(f"{column} TEXT NOT NULL DEFAULT ''" for _, column in spec["columns"])
+                self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, {columns})")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS students_uid ON students (university_id)")
+            # Version 1 ordered a student's marks by id, not by when they were taken
+            self.conn.execute("DROP INDEX IF EXISTS attendance_uid")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS attendance_uid_time ON attendance (university_id, date, time)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS attendance_date ON attendance (date, time)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS admins_name ON admins (name)")
+
+    def _migrate(self, source):
+        # One-shot import of the CSVs; runs before user_version is set, so an
+        # interrupted import is simply redone on the next start
+        with self.transaction():
+            for table in TABLES:
+                headers, rows = source.read_table(table)
+                if rows:
+                    print(f"[INFO] Importing {len(rows)} rows from {source.paths[table]} into {self.path}")
+                self.conn.execute(f"DELETE FROM {table}")
+                self._insert_rows(table, headers, rows)
+            self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def transaction(self, immediate=False):
+        return _Transaction(self.conn, immediate)
+
+    def _columns(self, table):
+        return [column for _, column in TABLES[table]["columns"]]
+
+    def _column_for(self, table, header):
+        key = header.strip().lower()
+        columns = self._columns(table)
+        for label, column in TABLES[table]["columns"]:
+            if key in (label.lower(), column):
+                return column
+        alias = COLUMN_ALIASES.get(key)
+        return alias if alias in columns else None
+
+    def _insert_rows(self, table, headers, rows):
+        # Blank CSV lines (the shipped login history is a lone "\r\n") aren't rows
+        rows = [row for row in rows if any(row)]
+        if not rows:
+            return
+        mapped = [(i, self._column_for(table, header)) for i, header in enumerate(headers)]
+        mapped = [(i, column) for i, column in mapped if column]
+        if not mapped:
+            return
+        columns = ", ".join(column for _, column in mapped)
+        marks = ", ".join("?" for _ in mapped)
+        self.conn.executemany(
+            f"INSERT INTO {table} ({columns}) VALUES ({marks})",
+            ([row[i].strip() if i < len(row) else "" for i, _ in mapped] for row in rows),
+        )
+
+    def read_table(self, table):
+        rows = self.conn.execute(f"SELECT {', '.join(self._columns(table))} FROM {table} ORDER BY id").fetchall()
+        if not rows and table == "login_history":
+            return [], []
+        return labels(table), [list(row) for row in rows]
+
+    def read_attendance(self, start=None, end=None):
+        # Served by the attendance_date index; partitioning is a csv-only option
+        rows = self.conn.execute(*self._attendance_query(start, end)).fetchall()
+        return [list(row) for row in rows]
+
+    def _attendance_query(self, start, end):
+        # Only the bounds actually given; a COALESCE(?, date) bound can't use the index
+        bounds, params = [], []
+        if start is not None:
+            bounds.append("date >= ?")
+            params.append(start)
+        if end is not None:
+            bounds.append("date <= ?")
+            params.append(end)
+        where = f" WHERE {' AND '.join(bounds)}" if bounds else ""
+        return f"SELECT {', '.join(self._columns('attendance'))} FROM attendance{where} ORDER BY id", params
+
+    def write_table(self, table, headers, rows):
+        with self.transaction(immediate=True):
+            self.conn.execute(f"DELETE FROM {table}")
+            self._insert_rows(table, headers, rows)
+
+    def append_row(self, table, values):
+        self._insert_rows(table, labels(table), [values])
+
+    def _row_id(self, table, position):
+        row = self.conn.execute(f"SELECT id FROM {table} ORDER BY id LIMIT 1 OFFSET ?", (position,)).fetchone()
+        if row is None:
+            raise IndexError(f"{table} has no row {position}")
+        return row[0]
+
+    def update_row(self, table, position, changes):
+        columns = self._columns(table)
+        assignments = ", ".join(f"{columns[col]} = ?" for col in changes)
+        with self.transaction(immediate=True):
+            row_id = self._row_id(table, position)
+            self.conn.execute(f"UPDATE {table} SET {assignments} WHERE id = ?", (*changes.values(), row_id))
+
+    def delete_row(self, table, position):
+        with self.transaction(immediate=True):
+            self.conn.execute(f"DELETE FROM {table} WHERE id = ?", (self._row_id(table, position),))
+
+    def clear_table(self, table):
+        self.conn.execute(f"DELETE FROM {table}")
+
+    def get_student(self, student_id):
+        row = self.conn.execute(
+            f"SELECT {', '.join(self._columns('students'))} FROM students WHERE university_id = ? ORDER BY id LIMIT 1",
+            (student_id.strip(),),
+        ).fetchone()
+        return clean_row(dict(zip(labels("students"), row))) if row else None
+
+    def attendance_summary(self, student_id):
+        count = self.conn.execute(
+            "SELECT COUNT(*) FROM attendance WHERE university_id = ?", (student_id,)).fetchone()[0]
+        last = self._last_row(student_id)
+        return count, f"{last[0]} {last[1]}" if last else "N/A"
+
+    def _last_row(self, student_id):
+        return self.conn.execute(
+            "SELECT date, time FROM attendance WHERE university_id = ? ORDER BY date DESC, time DESC LIMIT 1",
+            (student_id,),
+        ).fetchone()
+
+    def last_marked(self, student_id):
+        last = self._last_row(student_id)
+        if last is None:
+            return None
+        try:
+            return datetime.strptime(f"{last[0]} {last[1]}", TIME_FORMAT)
+        except ValueError as e:
+            print(f"[WARN] Failed to parse previous attendance time: {e}")
+            return None
+
+    def has_mark(self, student_id, date, time):
+        return self.conn.execute(
+            "SELECT 1 FROM attendance WHERE university_id = ? AND date = ? AND time = ? LIMIT 1",
+            (student_id, date, time),
+        ).fetchone() is not None
+
+    def write_attendance(self, rows, window=None, fsync=False):
+        # One transaction per batch. Each row is re-checked against marks
+        # other kiosks committed since the caller's own duplicate check
+        self.conn.execute(f"PRAGMA synchronous={'FULL' if fsync else 'NORMAL'}")
+        written = 0
+        with self.transaction(immediate=True):
+            for values in rows:
+                if window is not None:
+                    last_time = self.last_marked(values[1])
+                    marked_at = datetime.strptime(f"{values[5]} {values[6]}", TIME_FORMAT)
+                    if last_time is not None and marked_at - last_time < window:
+                        continue
+                self.append_row("attendance", values)
+                written += 1
+        return written
+
+    def data_version(self):
+        # Bumped by commits from other connections (admin panel, other kiosks)
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def maintain(self):
+        pass
+
+    def close(self):
+        self.conn.close()
+
+
+class _Transaction:
+    def __init__(self, conn, immediate):
+        self.conn = conn
+        self.immediate = immediate
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE" if self.immediate else "BEGIN")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def open_storage(backend=STORAGE_BACKEND, csv_paths=None):
+    if backend == "sqlite":
+        return SqliteStorage(DATABASE_PATH, csv_paths)
+    if backend != "csv":
+        print(f"[WARN] Unknown storage backend {backend!r}, using csv")
+    return CsvStorage(csv_paths)
@@ -0,0 +1,53 @@
+from csv_tail import CsvTailReader
+
+
+def clean_row(row):
+    return {str(k).strip(): str(v).strip() if v is not None else "" for k, v in row.items()}
+
+
+class StudentDirectory:
+    """students.csv held in memory as a dict keyed by University ID.
+
+    get() is a dict lookup after a single os.stat(). When the file's size or
+    mtime changes it is re-read: if it only grew (photoUpload.py appends)
+    just the new tail is parsed; a rewrite (adminPanel saves the whole
+    file) triggers a full reload. A student listed twice keeps their first
+    row, as the old linear scan did.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.students = {}
+        self._reader = CsvTailReader(path)
+        self.refresh()
+
+    @property
+    def fieldnames(self):
+        return self._reader.fieldnames
+
+    def get(self, student_id):
+        self.refresh()
+        row = self.students.get(student_id.strip())
+        # Callers decorate the row for display; keep the cached one pristine
+        return dict(row) if row is not None else None
+
+    def __contains__(self, student_id):
+        self.refresh()
+        return student_id.strip() in self.students
+
+    def __len__(self):
+        return len(self.students)
+
+    def refresh(self):
+        try:
+            rows, rewritten = self._reader.read()
+        except (OSError, UnicodeDecodeError, ValueError) as e:
+            print(f"[WARN] Failed to read {self.path}: {e}")
+            return
+        if rewritten:
+            self.students = {}
+        for row in rows:
+            row = clean_row(row)
+            student_id = row.get("University ID", "")
+            if student_id and student_id not in self.students:
+                self.students[student_id] = row
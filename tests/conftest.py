@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app is a set of flat top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,96 @@
+import os
+from datetime import datetime
+
+from attendance import AttendanceIndex, index_path_for
+
+HEADER = "Name,University ID,Program,Branch,Mobile,Date,Time\n"
+
+
+def mark(uid, day, time):
+    return f"Student,{uid},BTech,CSE,9999999999,{day},{time}\n"
+
+
+def write(path, text, mode="w"):
+    with open(path, mode, newline="") as f:
+        f.write(text)
+
+
+def bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def marks(count, first_time="09:00:00"):
+    # ``count`` marks for U1 on consecutive days, the first one at ``first_time``
+    lines = [mark("U1", f"2026-03-{day:02d}", "09:35:00") for day in range(2, count + 1)]
+    return [mark("U1", "2026-03-01", first_time)] + lines + [mark("U2", "2026-03-01", "09:00:00")]
+
+
+def test_appends_are_folded_in(tmp_path):
+    log = str(tmp_path / "attendance_log.csv")
+    write(log, HEADER + mark("U1", "2026-03-01", "09:00:00") + mark("U2", "2026-03-01", "09:01:00"))
+    index = AttendanceIndex(log)
+    assert index.summary("U1") == (1, "2026-03-01 09:00:00")
+
+    write(log, mark("U1", "2026-03-02", "09:05:00"), "a")
+    assert index.summary("U1") == (2, "2026-03-02 09:05:00")
+    assert index.last_marked("U1") == datetime(2026, 3, 2, 9, 5)
+    assert index.summary("U3") == (0, "N/A")
+
+
+def test_same_length_edit_is_picked_up(tmp_path):
+    log = str(tmp_path / "attendance_log.csv")
+    write(log, HEADER + "".join(marks(8)))
+    index = AttendanceIndex(log)
+    assert index.summary("U1") == (8, "2026-03-08 09:35:00")
+
+    # manual_edit_attendance rewrites the file with the first row given to
+    # another student, far from the end of the file
+    write(log, HEADER + "".join(marks(8)).replace("U1", "U3", 1))
+    bump_mtime(log)
+    assert index.summary("U1") == (7, "2026-03-08 09:35:00")
+    assert index.summary("U3") == (1, "2026-03-01 09:00:00")
+
+
+def test_saved_index_is_not_trusted_after_an_edit(tmp_path):
+    log = str(tmp_path / "attendance_log.csv")
+    write(log, HEADER + "".join(marks(8)))
+    index = AttendanceIndex(log)
+    index.summary("U1")
+    index.save()
+    assert os.path.exists(index_path_for(log))
+
+    write(log, HEADER + "".join(marks(8)).replace("U1", "U3", 1))
+    restarted = AttendanceIndex(log)
+    assert restarted.summary("U1") == (7, "2026-03-08 09:35:00")
+
+
+def test_saved_index_resumes_after_appends(tmp_path):
+    log = str(tmp_path / "attendance_log.csv")
+    write(log, HEADER + "".join(marks(3)))
+    index = AttendanceIndex(log)
+    index.summary("U1")
+    index.save()
+
+    write(log, mark("U1", "2026-03-04", "10:00:00"), "a")
+    restarted = AttendanceIndex(log)
+    assert restarted.summary("U1") == (4, "2026-03-04 10:00:00")
+    assert restarted.summary("U2") == (1, "2026-03-01 09:00:00")
+
+
+def test_deleted_row_is_a_rewrite(tmp_path):
+    log = str(tmp_path / "attendance_log.csv")
+    write(log, HEADER + "".join(marks(3)))
+    index = AttendanceIndex(log)
+    index.summary("U1")
+    write(log, HEADER + "".join(marks(3)[1:]))
+    assert index.summary("U1") == (2, "2026-03-03 09:35:00")
+
+
+def test_late_mark_does_not_move_last_backwards(tmp_path):
+    log = str(tmp_path / "attendance_log.csv")
+    write(log, HEADER + mark("U1", "2026-10-18", "09:00:00"))
+    index = AttendanceIndex(log)
+    write(log, mark("U1", "2026-01-01", "09:00:00") + mark("U1", "2026-10-18", "9:30:00"), "a")
+    assert index.summary("U1") == (3, "2026-10-18 09:30:00")
+    assert index.last_marked("U1") == datetime(2026, 10, 18, 9, 30)
@@ -0,0 +1,128 @@
+import gzip
+import os
+from datetime import date, datetime, timedelta
+
+from attendance import AttendanceIndex
+from attendance_log import PartitionedAttendanceLog
+from storage import CsvStorage, TABLES, labels
+
+
+def row(uid, day, time="09:00:00"):
+    return ["Student", uid, "BTech", "CSE", "9999999999", day, time]
+
+
+def partitioned(tmp_path, granularity="day"):
+    return PartitionedAttendanceLog(str(tmp_path / "attendance"), labels("attendance"), granularity)
+
+
+def index_for(log):
+    return AttendanceIndex(log.directory, path=os.path.join(log.directory, "index.json"),
+                           reader_factory=log.tail_reader)
+
+
+def test_rows_land_in_their_partitions(tmp_path):
+    log = partitioned(tmp_path)
+    log.append_rows([row("U1", "2026-03-01"), row("U2", "2026-03-02"), row("U1", "2026-03-02", "10:00:00")])
+    assert log.keys() == ["2026-03-01", "2026-03-02"]
+    assert [r[1] for r in log.read_range("2026-03-02", "2026-03-02")] == ["U2", "U1"]
+    assert len(log.rows_for_student("U1")) == 2
+
+    monthly = partitioned(tmp_path / "m", "month")
+    monthly.append_rows([row("U1", "2026-03-01"), row("U1", "2026-04-01")])
+    assert monthly.keys() == ["2026-03", "2026-04"]
+
+
+def test_old_partitions_are_compressed_and_stay_readable(tmp_path):
+    log = partitioned(tmp_path)
+    old = (date.today() - timedelta(days=60)).isoformat()
+    log.append_rows([row("U1", old), row("U1", date.today().isoformat())])
+    assert log.compress_older_than(30) == 1
+    with gzip.open(log.path_for(old, compressed=True), "rt") as f:
+        assert f.read().count("U1") == 1
+    assert len(log.read_range()) == 2
+
+    # A late row for the archived day reopens it
+    log.append_rows([row("U2", old)])
+    assert [r[1] for r in log.read_range(old, old)] == ["U1", "U2"]
+
+
+def test_index_follows_appends_edits_and_restarts(tmp_path):
+    log = partitioned(tmp_path)
+    log.append_rows([row("U1", "2026-03-01"), row("U1", "2026-03-02")])
+    index = index_for(log)
+    assert index.summary("U1") == (2, "2026-03-02 09:00:00")
+
+    log.append_rows([row("U1", "2026-03-03")])
+    assert index.summary("U1") == (3, "2026-03-03 09:00:00")
+    index.save()
+
+    log.delete_row(0)
+    restarted = index_for(partitioned(tmp_path))
+    assert restarted.summary("U1") == (2, "2026-03-03 09:00:00")
+
+
+def test_mark_in_an_older_partition_keeps_the_latest(tmp_path):
+    log = partitioned(tmp_path)
+    log.append_rows([row("U1", "2026-10-18")])
+    index = index_for(log)
+    assert index.last_marked("U1") == datetime(2026, 10, 18, 9)
+
+    # A late mark, or one replayed from an old recording
+    log.append_rows([row("U1", "2026-01-01")])
+    assert index.last_marked("U1") == datetime(2026, 10, 18, 9)
+    assert index.summary("U1")[0] == 2
+
+
+def test_moving_a_date_keeps_the_latest(tmp_path):
+    log = partitioned(tmp_path)
+    log.append_rows([row("U1", "2026-01-01"), row("U1", "2026-10-18")])
+    index = index_for(log)
+    log.update_row(0, {5: "2026-10-19"})
+    assert log.keys() == ["2026-10-18", "2026-10-19"]
+    assert index.summary("U1") == (2, "2026-10-19 09:00:00")
+
+
+def test_legacy_log_is_split_once(tmp_path):
+    paths = {table: str(tmp_path / spec["csv"]) for table, spec in TABLES.items()}
+    with open(paths["attendance"], "w", newline="") as f:
+        f.write(",".join(labels("attendance")) + "\n")
+        f.write(",".join(row("U1", "2026-03-01")) + "\n\n")
+        f.write(",".join(row("U2", "2026-03-02")) + "\n")
+    storage = CsvStorage(paths, partition="day", attendance_dir=str(tmp_path / "attendance"))
+    assert os.path.exists(paths["attendance"] + ".migrated") and not os.path.exists(paths["attendance"])
+    assert [r[1] for r in storage.read_attendance()] == ["U1", "U2"]
+    assert storage.attendance_summary("U2") == (1, "2026-03-02 09:00:00")
+    storage.close()
+
+
+def test_failed_manifest_update_does_not_fail_the_write(tmp_path, monkeypatch):
+    log = partitioned(tmp_path)
+    log.append_rows([row("U1", "2026-03-01")])
+
+    def disk_full():
+        raise OSError("disk full")
+
+    monkeypatch.setattr(log, "_save_manifest", disk_full)
+    log.append_rows([row("U2", "2026-03-01")])
+    monkeypatch.undo()
+    # The rows are on disk once, and a fresh reader isn't misled by the old manifest
+    assert [r[1] for r in partitioned(tmp_path).read_range()] == ["U1", "U2"]
+    assert not [name for name in os.listdir(log.directory) if name.endswith(".tmp")]
+
+
+def test_lookups_stat_only_the_newest_partition(tmp_path, monkeypatch):
+    log = partitioned(tmp_path)
+    log.append_rows([row("U1", f"2026-03-{day:02d}") for day in range(1, 29)])
+    index = index_for(log)
+    assert index.summary("U1") == (28, "2026-03-28 09:00:00")
+
+    def no_listing(path):
+        raise AssertionError(f"listed {path}")
+
+    monkeypatch.setattr(os, "listdir", no_listing)
+    # Another kiosk appends, to today's partition and to a new one
+    other = partitioned(tmp_path)
+    other.append_rows([row("U1", "2026-03-28", "10:00:00")])
+    assert index.summary("U1") == (29, "2026-03-28 10:00:00")
+    other.append_rows([row("U1", "2026-03-29")])
+    assert index.summary("U1") == (30, "2026-03-29 09:00:00")
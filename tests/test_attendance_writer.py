@@ -0,0 +1,107 @@
+import csv
+import threading
+
+import pytest
+
+from attendance_writer import AttendanceWriter
+from storage import CsvStorage, SqliteStorage, TABLES
+
+
+class FlakyStorage:
+    # Fails every write until ``healthy`` is set
+    def __init__(self):
+        self.rows = []
+        self.healthy = threading.Event()
+
+    def maintain(self):
+        pass
+
+    def write_attendance(self, rows, window=None, fsync=False):
+        if not self.healthy.is_set():
+            raise OSError("disk full")
+        self.rows.extend(rows)
+        return len(rows)
+
+    def has_mark(self, student_id, date, time):
+        return any(values[1] == student_id and values[5:7] == [date, time] for values in self.rows)
+
+    def close(self):
+        pass
+
+
+def fails_after_writing(storage_class):
+    # The rows reach the storage, then the first write reports a failure
+    # (a failed fsync or manifest update, say)
+    class FailsAfterWriting(storage_class):
+        failures = 1
+
+        def write_attendance(self, rows, window=None, fsync=False):
+            written = super().write_attendance(rows, window, fsync)
+            if self.failures:
+                self.failures -= 1
+                raise OSError("fsync failed")
+            return written
+
+    return FailsAfterWriting
+
+
+def row(uid, time="09:00:00"):
+    return ["Student", uid, "BTech", "CSE", "9999999999", "2026-03-01", time]
+
+
+def writer_for(storage, tmp_path):
+    writer = AttendanceWriter(flush_interval=0.0, storage_factory=lambda: storage, retry_interval=0.05,
+                              spill_path=str(tmp_path / "unwritten.csv"))
+    writer.start()
+    return writer
+
+
+def test_failed_rows_stay_pending_and_are_retried(tmp_path):
+    storage = FlakyStorage()
+    writer = writer_for(storage, tmp_path)
+    writer.submit(row("U1"))
+    writer.submit(row("U2"))
+    while writer.error is None:
+        threading.Event().wait(0.01)
+    assert writer.pending_count("U1") == 1 and writer.last_pending("U2") is not None
+
+    storage.healthy.set()
+    writer.flush()
+    assert sorted(values[1] for values in storage.rows) == ["U1", "U2"]
+    assert writer.error is None and writer.pending_count("U1") == 0
+    writer.close()
+
+
+def test_unwritten_rows_are_spilled_on_close(tmp_path):
+    storage = FlakyStorage()
+    writer = writer_for(storage, tmp_path)
+    writer.submit(row("U1"))
+    while writer.error is None:
+        threading.Event().wait(0.01)
+    writer.close()
+
+    with open(tmp_path / "unwritten.csv", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0][1] == "University ID" and rows[1] == row("U1")
+    assert storage.rows == [] and writer.pending_count("U1") == 0
+
+
+@pytest.mark.parametrize("backend", ["csv", "sqlite"])
+def test_retry_after_a_late_failure_writes_each_row_once(backend, tmp_path):
+    paths = {table: str(tmp_path / spec["csv"]) for table, spec in TABLES.items()}
+    if backend == "sqlite":
+        storage = fails_after_writing(SqliteStorage)(str(tmp_path / "attendance.db"), paths)
+    else:
+        storage = fails_after_writing(CsvStorage)(paths, partition="none")
+    writer = writer_for(storage, tmp_path)
+    writer.submit(row("U1"))
+    writer.submit(row("U2"))
+    writer.flush()
+    writer.submit(row("U1", "09:30:00"))
+    writer.flush()
+    writer.close()
+
+    storage = storage.reopen()
+    assert [(values[1], values[6]) for values in storage.read_attendance()] == [
+        ("U1", "09:00:00"), ("U2", "09:00:00"), ("U1", "09:30:00")]
+    storage.close()
@@ -0,0 +1,143 @@
+import os
+
+import pytest
+
+from csv_tail import CsvTailReader, replacing
+from students import StudentDirectory
+
+HEADER = "Name,University ID,Program,Branch,Mobile,Gmail,Image Path\n"
+
+
+def student_line(i, mobile="9999999999"):
+    return f"Student {i},U{i:03d},BTech,CSE,{mobile},u{i}@example.com,images/U{i:03d}.jpg\n"
+
+
+def write(path, text, mode="w"):
+    with open(path, mode, newline="") as f:
+        f.write(text)
+
+
+def replace(path, text):
+    # How the app rewrites a file: a new file moved over the old one
+    with replacing(path) as tmp_path:
+        write(tmp_path, text)
+
+
+def bump_mtime(path):
+    # Coarse filesystem clocks could otherwise hide a quick rewrite
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_append_reads_only_new_rows(tmp_path):
+    path = str(tmp_path / "students.csv")
+    write(path, HEADER + student_line(1) + student_line(2))
+    reader = CsvTailReader(path)
+    rows, rewritten = reader.read()
+    assert [row["University ID"] for row in rows] == ["U001", "U002"] and not rewritten
+
+    write(path, student_line(3), "a")
+    rows, rewritten = reader.read()
+    assert [row["University ID"] for row in rows] == ["U003"] and not rewritten
+    assert reader.read() == ([], False)
+
+
+def test_half_written_line_waits_for_the_rest(tmp_path):
+    path = str(tmp_path / "students.csv")
+    write(path, HEADER + student_line(1) + "Student 2,U0")
+    reader = CsvTailReader(path)
+    assert len(reader.read()[0]) == 1
+    write(path, student_line(2)[len("Student 2,U0"):], "a")
+    rows, rewritten = reader.read()
+    assert [row["University ID"] for row in rows] == ["U002"] and not rewritten
+
+
+def test_same_length_edit_is_a_rewrite(tmp_path):
+    path = str(tmp_path / "students.csv")
+    write(path, HEADER + "".join(student_line(i) for i in range(50)))
+    reader = CsvTailReader(path)
+    reader.read()
+
+    write(path, HEADER + "".join(student_line(i, "8888888888" if i == 7 else "9999999999") for i in range(50)))
+    bump_mtime(path)
+    rows, rewritten = reader.read()
+    assert rewritten and len(rows) == 50
+    assert rows[7]["Mobile"] == "8888888888"
+
+
+def test_edit_before_an_append_is_a_rewrite(tmp_path):
+    # The file grew, but something already read changed too
+    path = str(tmp_path / "students.csv")
+    write(path, HEADER + "".join(student_line(i) for i in range(50)))
+    reader = CsvTailReader(path)
+    reader.read()
+
+    lines = [student_line(i, "8888888888" if i == 3 else "9999999999") for i in range(51)]
+    replace(path, HEADER + "".join(lines))
+    rows, rewritten = reader.read()
+    assert rewritten and len(rows) == 51
+    assert rows[3]["Mobile"] == "8888888888"
+
+
+def test_shrink_is_a_rewrite(tmp_path):
+    path = str(tmp_path / "students.csv")
+    write(path, HEADER + student_line(1) + student_line(2))
+    reader = CsvTailReader(path)
+    reader.read()
+    write(path, HEADER + student_line(2))
+    rows, rewritten = reader.read()
+    assert rewritten and [row["University ID"] for row in rows] == ["U002"]
+
+
+def test_restored_state_is_checked_against_the_file(tmp_path):
+    path = str(tmp_path / "students.csv")
+    write(path, HEADER + student_line(1) + student_line(2))
+    reader = CsvTailReader(path)
+    reader.read()
+    state = reader.state()
+
+    write(path, student_line(3), "a")
+    restored = CsvTailReader(path)
+    restored.restore(state)
+    rows, rewritten = restored.read()
+    assert [row["University ID"] for row in rows] == ["U003"] and not rewritten
+
+    # Replaced with more rows: the saved position can't be trusted
+    replace(path, HEADER + student_line(1, "8888888888") + student_line(2) + student_line(3) + student_line(4))
+    restored = CsvTailReader(path)
+    restored.restore(state)
+    rows, rewritten = restored.read()
+    assert rewritten and len(rows) == 4 and rows[0]["Mobile"] == "8888888888"
+
+
+def test_changed_last_line_is_a_rewrite(tmp_path):
+    # Even in place, a grown file whose last-read bytes changed is not an append
+    path = str(tmp_path / "students.csv")
+    write(path, HEADER + student_line(1) + student_line(2))
+    reader = CsvTailReader(path)
+    reader.read()
+    write(path, HEADER + student_line(1) + student_line(2, "8888888888") + student_line(3))
+    rows, rewritten = reader.read()
+    assert rewritten and [row["Mobile"] for row in rows] == ["9999999999", "8888888888", "9999999999"]
+
+
+def test_failed_replace_leaves_the_file_alone(tmp_path):
+    path = str(tmp_path / "students.csv")
+    write(path, HEADER + student_line(1))
+    with pytest.raises(RuntimeError):
+        with replacing(path) as staged:
+            write(staged, HEADER)
+            raise RuntimeError("interrupted")
+    assert open(path).read() == HEADER + student_line(1)
+    assert os.listdir(tmp_path) == ["students.csv"]
+
+
+def test_student_directory_picks_up_admin_edits(tmp_path):
+    path = str(tmp_path / "students.csv")
+    write(path, HEADER + "".join(student_line(i) for i in range(50)))
+    directory = StudentDirectory(path)
+    assert directory.get("U010")["Mobile"] == "9999999999"
+
+    write(path, HEADER + "".join(student_line(i, "7777777777" if i == 10 else "9999999999") for i in range(50)))
+    bump_mtime(path)
+    assert directory.get("U010")["Mobile"] == "7777777777"
@@ -0,0 +1,45 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from engine import AttendanceEngine
+from storage import CsvStorage, SqliteStorage, TABLES, CSV_PATHS
+
+STUDENT = {"Name": "Asha", "University ID": "U1", "Program": "BTech", "Branch": "CSE", "Mobile": "9999999999"}
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def storage(request, tmp_path):
+    paths = {table: str(tmp_path / spec["csv"]) for table, spec in TABLES.items()}
+    if request.param == "sqlite":
+        return SqliteStorage(str(tmp_path / "attendance.db"), paths)
+    return CsvStorage(paths, partition="none")
+
+
+def file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else None
+
+
+def test_marks_are_written_to_the_injected_storage(storage):
+    before = file_size(CSV_PATHS["attendance"])
+    engine = AttendanceEngine(storage)
+    now = datetime(2026, 3, 1, 9, 0)
+    assert engine.mark_attendance(STUDENT, now)["type"] == "marked"
+    engine.writer.flush()
+
+    assert storage.attendance_summary("U1") == (1, "2026-03-01 09:00:00")
+    assert engine.mark_attendance(STUDENT, now + timedelta(minutes=5))["type"] == "duplicate"
+    assert engine.mark_attendance(STUDENT, now + timedelta(minutes=15))["type"] == "marked"
+    engine.close()
+    # The app's own attendance log is left alone
+    assert file_size(CSV_PATHS["attendance"]) == before
+
+
+def test_dry_run_writes_nothing(storage):
+    engine = AttendanceEngine(storage, write=False)
+    now = datetime(2026, 3, 1, 9, 0)
+    assert engine.mark_attendance(STUDENT, now)["type"] == "marked"
+    assert engine.mark_attendance(STUDENT, now + timedelta(minutes=1))["type"] == "duplicate"
+    assert storage.attendance_summary("U1") == (0, "N/A")
+    engine.close()
@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from storage import CsvStorage, SqliteStorage, TABLES, labels
+
+STUDENTS = ("Name,University ID,Program,Branch,Mobile,Gmail,Image Path\n"
+            "Asha,U1,BTech,CSE,9999999999,asha@example.com,images/U1.jpg\n")
+ATTENDANCE = ("Name,University ID,Program,Branch,Mobile,Date,Time\n"
+              "Asha,U1,BTech,CSE,9999999999,2026-03-01,09:00:00\n")
+
+
+def csv_files(directory, login_history="\r\n"):
+    paths = {table: os.path.join(directory, spec["csv"]) for table, spec in TABLES.items()}
+    contents = {"students": STUDENTS, "attendance": ATTENDANCE,
+                "admins": "Name,Email,Password\nroot,root@example.com,x\n", "login_history": login_history}
+    for table, text in contents.items():
+        with open(paths[table], "w", newline="") as f:
+            f.write(text)
+    return paths
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def storage(request, tmp_path):
+    paths = csv_files(str(tmp_path))
+    if request.param == "sqlite":
+        backend = SqliteStorage(str(tmp_path / "attendance.db"), paths)
+    else:
+        backend = CsvStorage(paths, partition="none")
+    yield backend
+    backend.close()
+
+
+def test_blank_csv_lines_are_not_migrated(tmp_path):
+    paths = csv_files(str(tmp_path), login_history="\r\n2026-03-01 09:00:00,root,Login\r\n\r\n")
+    db = SqliteStorage(str(tmp_path / "attendance.db"), paths)
+    _, rows = db.read_table("login_history")
+    assert rows == [["2026-03-01 09:00:00", "root", "Login"]]
+    db.close()
+
+
+def test_empty_login_history_migrates_to_nothing(tmp_path):
+    db = SqliteStorage(str(tmp_path / "attendance.db"), csv_files(str(tmp_path)))
+    assert db.read_table("login_history") == ([], [])
+    db.close()
+
+
+def test_students_and_attendance_lookups(storage):
+    assert storage.get_student("U1")["Name"] == "Asha"
+    assert storage.get_student("U2") is None
+    assert storage.attendance_summary("U1") == (1, "2026-03-01 09:00:00")
+
+    storage.write_attendance([["Asha", "U1", "BTech", "CSE", "9999999999", "2026-03-02", "09:05:00"]])
+    assert storage.attendance_summary("U1") == (2, "2026-03-02 09:05:00")
+    assert [row[5] for row in storage.read_attendance("2026-03-02", "2026-03-02")] == ["2026-03-02"]
+
+
+def test_row_edits(storage):
+    storage.append_row("admins", ["second", "second@example.com", "y"])
+    storage.update_row("admins", 1, {2: "z"})
+    _, rows = storage.read_table("admins")
+    assert rows[1] == ["second", "second@example.com", "z"]
+
+    storage.delete_row("admins", 0)
+    headers, rows = storage.read_table("admins")
+    assert headers == labels("admins") and [row[0] for row in rows] == ["second"]
+
+
+def test_edited_student_is_served(storage):
+    assert storage.get_student("U1")["Mobile"] == "9999999999"
+    headers, rows = storage.read_table("students")
+    rows[0][4] = "8888888888"
+    # Same length, possibly within the same mtime tick
+    storage.write_table("students", headers, rows)
+    assert storage.get_student("U1")["Mobile"] == "8888888888"
+
+
+def test_latest_mark_wins_over_insertion_order(storage):
+    # A mark spilled by an offline kiosk arrives after later ones
+    storage.write_attendance([["Asha", "U1", "BTech", "CSE", "9999999999", "2026-03-03", "09:00:00"],
+                              ["Asha", "U1", "BTech", "CSE", "9999999999", "2026-03-02", "09:00:00"]])
+    assert storage.attendance_summary("U1") == (3, "2026-03-03 09:00:00")
+
+
+def test_version_1_database_is_upgraded_in_place(tmp_path):
+    paths = csv_files(str(tmp_path))
+    db = SqliteStorage(str(tmp_path / "attendance.db"), paths)
+    db.conn.execute("DROP INDEX attendance_uid_time")
+    db.conn.execute("CREATE INDEX attendance_uid ON attendance (university_id, id)")
+    db.conn.execute("PRAGMA user_version = 1")
+    db.write_attendance([["Asha", "U1", "BTech", "CSE", "9999999999", "2026-03-02", "09:00:00"]])
+    db.close()
+
+    db = SqliteStorage(str(tmp_path / "attendance.db"), paths)
+    indexes = {row[1] for row in db.conn.execute("PRAGMA index_list(attendance)")}
+    assert "attendance_uid_time" in indexes and "attendance_uid" not in indexes
+    # Not re-imported from the CSVs
+    assert db.attendance_summary("U1") == (2, "2026-03-02 09:00:00")
+    db.close()
+
+
+def test_date_range_uses_the_index(tmp_path):
+    db = SqliteStorage(str(tmp_path / "attendance.db"), csv_files(str(tmp_path)))
+    for start, end in (("2026-03-01", "2026-03-31"), ("2026-03-02", "2026-03-02")):
+        sql, params = db._attendance_query(start, end)
+        plan = db.conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+        assert any("USING INDEX attendance_date" in step[-1] for step in plan), plan
+    assert len(db.read_attendance()) == 1 and db.read_attendance("2026-03-02") == []
+    db.close()
@@ -0,0 +1,110 @@
+import dlib
+
+from settings import DETECT_EVERY_N_FRAMES, TRACKER_MIN_QUALITY
+
+
+def box_iou(a, b):
+    ax1, ay1, ax2, ay2 = a
+    bx1, by1, bx2, by2 = b
+    iw = min(ax2, bx2) - max(ax1, bx1)
+    ih = min(ay2, by2) - max(ay1, by1)
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    union = (ax2 - ax1) * (ay2 - ay1) + (bx2 - bx1) * (by2 - by1) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class FaceTracker:
+    """Follows faces between detections with dlib correlation trackers.
+
+    Call needs_detection() each frame. When it is True run the detector and
+    pass the boxes to reconcile(), which matches them to existing tracks by
+    IoU so each face keeps its track ID; otherwise call update(). Both return
+    a list of (track_id, box) with boxes as (x1, y1, x2, y2) in frame pixels.
+    """
+
+    def __init__(self, detect_every=DETECT_EVERY_N_FRAMES, min_quality=TRACKER_MIN_QUALITY, min_iou=0.3):
+        self.detect_every = max(1, detect_every)
+        self.min_quality = min_quality
+        self.min_iou = min_iou
+        self.tracks = {}
+        self._next_id = 1
+        self._frames_since_detect = self.detect_every
+        self._lost = False
+        # Last known boxes of tracks dropped since the previous detection
+        self.lost_boxes = []
+
+    def needs_detection(self):
+        return self._lost or self._frames_since_detect >= self.detect_every
+
+    def update(self, image):
+        self._frames_since_detect += 1
+        height, width = image.shape[:2]
+        results = []
+        for track_id, track in list(self.tracks.items()):
+            quality = track["tracker"].update(image)
+            if quality < self.min_quality:
+                # Lost the face; force a detection on the next frame
+                self.lost_boxes.append(track["box"])
+                del self.tracks[track_id]
+                self._lost = True
+                continue
+            pos = track["tracker"].get_position()
+            box = (
+                max(0, int(pos.left())), max(0, int(pos.top())),
+                min(width - 1, int(pos.right())), min(height - 1, int(pos.bottom())),
+            )
+            if box[2] <= box[0] or box[3] <= box[1]:
+                self.lost_boxes.append(track["box"])
+                del self.tracks[track_id]
+                self._lost = True
+                continue
+            track["box"] = box
+            track["quality"] = quality
+            results.append((track_id, box))
+        return results
+
+    def reconcile(self, image, boxes):
+        self._frames_since_detect = 0
+        self._lost = False
+        self.lost_boxes = []
+
+        # Greedy IoU assignment, best overlaps first
+        pairs = sorted(
+            ((box_iou(track["box"], box), track_id, i)
+             for track_id, track in self.tracks.items()
+             for i, box in enumerate(boxes)),
+            reverse=True,
+        )
+        assigned = {}
+        used_tracks = set()
+        for iou, track_id, i in pairs:
+            if iou < self.min_iou:
+                break
+            if track_id in used_tracks or i in assigned:
+                continue
+            assigned[i] = track_id
+            used_tracks.add(track_id)
+
+        tracks = {}
+        results = []
+        for i, box in enumerate(boxes):
+            track_id = assigned.get(i)
+            if track_id is None:
+                track_id = self._next_id
+                self._next_id += 1
+            # Re-seed the tracker on the fresh detection to stop drift
+            tracker = dlib.correlation_tracker()
+            tracker.start_track(image, dlib.rectangle(*[int(v) for v in box]))
+            tracks[track_id] = {"tracker": tracker, "box": tuple(box), "quality": None}
+            results.append((track_id, tuple(box)))
+        # Tracks without a matching detection are dropped
+        self.tracks = tracks
+        return results
+
+    def reset(self):
+        self.tracks = {}
+        self._frames_since_detect = self.detect_every
+        self._lost = False
+        self.lost_boxes = []
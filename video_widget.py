@@ -0,0 +1,100 @@
+from PyQt5.QtWidgets import QWidget, QSizePolicy
+from PyQt5.QtGui import QImage, QPainter, QPen, QColor, QFont
+import time
+
+from PyQt5.QtCore import Qt, QRectF
+
+# Qt < 5.14 has no BGR format; those builds pay for one rgbSwapped() copy
+_BGR_FORMAT = getattr(QImage, "Format_BGR888", None)
+
+
+class VideoWidget(QWidget):
+    """Paints camera frames straight from the BGR numpy buffer.
+
+    set_frame() only stores a reference and schedules a repaint. paintEvent
+    wraps the buffer in a QImage (no copy, no cvtColor) and lets QPainter
+    scale it into the widget, so there is no per-frame scaled()/QPixmap
+    allocation. Boxes and labels are painted on top in frame coordinates
+    instead of being burned into the frame, which also leaves the buffer
+    untouched for anyone else holding it.
+
+    Overlays are (box, color, lines) with color an (r, g, b) tuple and
+    lines a list of (text, (r, g, b)) drawn upwards from the box's top edge.
+
+    set_stats() shows a block of text (the latency overlay) in the top-left
+    corner; with ``metrics`` set, each paint is recorded as the "render" stage.
+    """
+
+    def __init__(self, width, height, parent=None):
+        super().__init__(parent)
+        self.setFixedSize(width, height)
+        self.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self._frame = None
+        self._overlays = []
+        self.border_color = QColor("#7A5FFF")
+        self.overlay_font = QFont("Arial", 12, QFont.Bold)
+        self.stats_font = QFont("Monospace", 9)
+        self.stats_font.setStyleHint(QFont.TypeWriter)
+        self._stats = []
+        self.metrics = None
+
+    def set_frame(self, frame, overlays=()):
+        self._frame = frame
+        self._overlays = list(overlays)
+        self.update()
+
+    def clear(self):
+        self.set_frame(None)
+
+    def set_stats(self, lines):
+        self._stats = list(lines)
+        self.update()
+
+    def paintEvent(self, event):
+        start = time.perf_counter()
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.white)
+        frame = self._frame
+        if frame is not None:
+            h, w = frame.shape[:2]
+            if _BGR_FORMAT is not None:
+                image = QImage(frame.data, w, h, frame.strides[0], _BGR_FORMAT)
+            else:
+                image = QImage(frame.data, w, h, frame.strides[0], QImage.Format_RGB888).rgbSwapped()
+
+            # Keep aspect ratio inside the border, centred
+            inner = QRectF(self.rect()).adjusted(4, 4, -4, -4)
+            scale = min(inner.width() / w, inner.height() / h)
+            target = QRectF(0, 0, w * scale, h * scale)
+            target.moveCenter(inner.center())
+            painter.drawImage(target, image)
+
+            painter.save()
+            painter.translate(target.topLeft())
+            painter.scale(scale, scale)
+            painter.setFont(self.overlay_font)
+            for box, color, lines in self._overlays:
+                x1, y1, x2, y2 = box
+                painter.setPen(QPen(QColor(*color), 2))
+                painter.drawRect(x1, y1, x2 - x1, y2 - y1)
+                for i, (text, text_color) in enumerate(lines):
+                    painter.setPen(QColor(*text_color))
+                    painter.drawText(x1, y1 - 10 - 30 * i, text)
+            painter.restore()
+
+        if self._stats:
+            painter.setFont(self.stats_font)
+            line_height = painter.fontMetrics().height()
+            width = max(painter.fontMetrics().width(line) for line in self._stats) + 16
+            painter.fillRect(8, 8, width, line_height * len(self._stats) + 8, QColor(0, 0, 0, 160))
+            painter.setPen(QColor(255, 255, 255))
+            for i, line in enumerate(self._stats):
+                painter.drawText(16, 12 + line_height * (i + 1) - painter.fontMetrics().descent(), line)
+
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(self.border_color, 4))
+        painter.drawRoundedRect(QRectF(self.rect()).adjusted(2, 2, -2, -2), 12, 12)
+        painter.end()
+        if self.metrics is not None:
+            self.metrics.record("render", (time.perf_counter() - start) * 1000.0)